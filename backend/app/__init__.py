@@ -1,8 +1,9 @@
 from flask import Flask
 from .config import Config
-from .extensions import db, jwt, cors, migrate
+from .extensions import db, jwt, cors, migrate, engine_options, init_engine_profile
 from flask_cors import CORS
-from flask import send_from_directory
+from flask import request, abort
+from werkzeug.security import safe_join
 import os
 from dotenv import load_dotenv  # type: ignore
 
@@ -16,6 +17,9 @@ def create_app(config_class: type = Config) -> Flask:
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    from .json_provider import init_app as init_json_provider
+    init_json_provider(app)
+
     # Configure CORS for frontend domains
     CORS(app, resources={
         r"/api/*": {
@@ -30,7 +34,9 @@ def create_app(config_class: type = Config) -> Flask:
         }
     })
 
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app)
     db.init_app(app)
+    init_engine_profile(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
     cors.init_app(app, resources={r"/*": {"origins": app.config.get("CORS_ORIGINS", "*")}})
@@ -42,12 +48,15 @@ def create_app(config_class: type = Config) -> Flask:
     from .routes.admin import admin_bp
     from .routes.ai import ai_bp
 
-    # Ensure tables exist (fallback if migrations not run)
-    with app.app_context():
-        try:
-            db.create_all()
-        except Exception:
-            pass
+    # Schema creation is an explicit step (`flask init-db`); DB_AUTO_CREATE=1 restores
+    # the old create-on-boot fallback for throwaway local databases.
+    if app.config.get("DB_AUTO_CREATE"):
+        from .schema import ensure_schema
+        with app.app_context():
+            try:
+                ensure_schema(db.engine)
+            except Exception:
+                pass
 
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
     app.register_blueprint(farmer_bp, url_prefix="/api/farmer")
@@ -55,10 +64,45 @@ def create_app(config_class: type = Config) -> Flask:
     app.register_blueprint(admin_bp, url_prefix="/api/admin")
     app.register_blueprint(ai_bp, url_prefix="/api/ai")
 
+    from .commands import register_commands
+    register_commands(app)
+
+    from . import metrics, profiling, pipelines, jobs, variants, weather, llm, answer_cache, response_cache
+    metrics.init_app(app)
+    profiling.init_app(app)
+    response_cache.init_app(app)
+    llm.init_app(app)
+    answer_cache.init_app(app)
+    pipelines.init_app(app)
+    jobs.init_app(app)
+    variants.init_app(app)
+    weather.init_app(app)
+
+    from .uploads import send_upload
+
     @app.get("/uploads/<path:filename>")
     def uploads(filename: str):
         upload_dir = app.config.get("UPLOAD_FOLDER")
-        return send_from_directory(upload_dir, filename)
+        width = request.args.get("w", type=int)
+        fmt = request.args.get("fmt")
+        if width or fmt:
+            # A second attempt covers a variant evicted by another worker between lookup and send
+            for attempt in range(2):
+                try:
+                    path, mimetype = variants.variant_cache.get(upload_dir, filename, width, fmt)
+                    return send_upload(path, filename, mimetype)
+                except FileNotFoundError:
+                    if attempt:
+                        abort(404)
+                except variants.NotAnImage:
+                    # Resizing does not apply; the original file is the only representation
+                    break
+                except variants.VariantError as e:
+                    return {"error": str(e)}, 400
+        path = safe_join(upload_dir, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        return send_upload(path, filename)
 
     @app.get("/api/health")
     def health():
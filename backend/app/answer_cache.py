@@ -0,0 +1,203 @@
+import hashlib
+import os
+import sqlite3
+import time
+import unicodedata
+from contextlib import contextmanager
+from typing import Optional
+
+from flask import Flask
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    key TEXT PRIMARY KEY,
+    loose_key TEXT NOT NULL,
+    model TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_answers_loose ON answers (model, loose_key);
+CREATE INDEX IF NOT EXISTS ix_answers_last_used ON answers (last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# Words that do not change what a farmer is asking about. Question words and
+# modals stay: "when to plant tomato" and "how to plant tomato" need different answers.
+_STOPWORDS = frozenset(
+    "a an and are for i in is it me my of on or the to with you".split()
+)
+
+
+def _words(question: str) -> list[str]:
+    # Letters, combining marks and digits in any script: Hindi or Tamil questions keep
+    # their words (r"\w" would split them at vowel signs, r"[a-z0-9]" drops them)
+    text = unicodedata.normalize("NFKC", question).casefold()
+    return "".join(ch if unicodedata.category(ch)[0] in "LMN" else " " for ch in text).split()
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(_words(question))
+
+
+def loose_question(question: str) -> str:
+    """Order- and filler-insensitive form: "How do I treat the tomato blights?" == "how do i treat blight on tomato"."""
+    words = {w[:-1] if len(w) > 3 and w.endswith("s") else w for w in _words(question)}
+    return " ".join(sorted(words - _STOPWORDS))
+
+
+def _digest(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+
+
+class AnswerCache:
+    """Chatbot answers in a SQLite file shared by every gunicorn worker.
+
+    Entries are keyed by model plus normalized question, with an optional
+    second lookup on the loose form to catch rephrasings. They expire after
+    `ttl` seconds, and the least recently used are evicted beyond `max_entries`.
+    """
+
+    def __init__(self):
+        self.path: Optional[str] = None
+        self.ttl = 7 * 24 * 3600.0
+        self.max_entries = 5000
+        self.fuzzy = False
+        self._puts = 0
+        self._schema_ready = False
+
+    def configure(self, path: str, ttl: float, max_entries: int, fuzzy: bool = False) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.fuzzy = fuzzy
+        self._schema_ready = False
+
+    @contextmanager
+    def _connect(self):
+        if not self.path:
+            raise RuntimeError("Answer cache is not configured")
+        if not self._schema_ready:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            if not self._schema_ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                self._schema_ready = True
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _count(conn: sqlite3.Connection, name: str) -> None:
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, question: str, model: str) -> Optional[str]:
+        # A broken or locked cache file degrades to a miss, never to a failed request
+        try:
+            return self._get(question, model)
+        except sqlite3.Error:
+            return None
+
+    def put(self, question: str, model: str, answer: str) -> None:
+        try:
+            self._put(question, model, answer)
+        except sqlite3.Error:
+            pass
+
+    def _get(self, question: str, model: str) -> Optional[str]:
+        normalized, loose = normalize_question(question), loose_question(question)
+        if not (normalized and loose):
+            # An empty key would be shared by every such question; leave them uncached
+            return None
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT key, answer FROM answers WHERE key = ? AND created_at > ?",
+                (_digest(model, normalized), now - self.ttl),
+            ).fetchone()
+            kind = "hits"
+            if row is None and self.fuzzy:
+                row = conn.execute(
+                    "SELECT key, answer FROM answers WHERE model = ? AND loose_key = ? AND created_at > ? "
+                    "ORDER BY last_used DESC LIMIT 1",
+                    (model, loose, now - self.ttl),
+                ).fetchone()
+                kind = "fuzzy_hits"
+            if row is None:
+                self._count(conn, "misses")
+                return None
+            conn.execute("UPDATE answers SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, row[0]))
+            self._count(conn, kind)
+            return row[1]
+
+    def _put(self, question: str, model: str, answer: str) -> None:
+        normalized, loose = normalize_question(question), loose_question(question)
+        if not (normalized and loose):
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO answers (key, loose_key, model, question, answer, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (_digest(model, normalized), loose, model, question, answer, now, now),
+            )
+            self._puts += 1
+            # Checking the size on every write is wasted work; every 32nd keeps it close to the bound
+            if self._puts % 32 == 1:
+                self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM answers WHERE created_at <= ?", (now - self.ttl,))
+        excess = conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY last_used ASC LIMIT ?)",
+                (excess,),
+            )
+            conn.execute(
+                "INSERT INTO counters (name, value) VALUES ('evictions', ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (excess,),
+            )
+
+    def stats(self) -> dict:
+        try:
+            return self._stats()
+        except sqlite3.Error as e:
+            return {"error": f"Answer cache unavailable: {e}"}
+
+    def _stats(self) -> dict:
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            entries = conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        return {
+            "entries": entries,
+            "maxEntries": self.max_entries,
+            "hits": counters.get("hits", 0),
+            "fuzzyHits": counters.get("fuzzy_hits", 0),
+            "misses": counters.get("misses", 0),
+            "evictions": counters.get("evictions", 0),
+        }
+
+
+answer_cache = AnswerCache()
+
+
+def init_app(app: Flask) -> None:
+    answer_cache.configure(
+        app.config.get("ANSWER_CACHE_PATH") or os.path.join(app.instance_path, "answer_cache.db"),
+        ttl=float(app.config.get("ANSWER_CACHE_TTL", 7 * 24 * 3600)),
+        max_entries=int(app.config.get("ANSWER_CACHE_MAX_ENTRIES", 5000)),
+        fuzzy=bool(app.config.get("ANSWER_CACHE_FUZZY", False)),
+    )
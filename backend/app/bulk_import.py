@@ -0,0 +1,114 @@
+import csv
+import io
+import json
+import math
+from typing import IO, Iterator, Optional, Union
+
+CSV_TYPES = ("text/csv", "application/csv")
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+MAX_CROP_NAME = 120
+MAX_IMAGE_URL = 255
+
+# Accepted spellings per field; CSV headers are matched case-insensitively
+_ALIASES = {
+    "cropName": ("cropname", "crop_name", "crop", "name"),
+    "price": ("price",),
+    "quantity": ("quantity", "qty"),
+    "imageUrl": ("imageurl", "image_url"),
+    "available": ("available",),
+}
+
+
+class BulkFormatError(Exception):
+    pass
+
+
+def detect_format(mimetype: str, filename: Optional[str] = None) -> Optional[str]:
+    if mimetype in CSV_TYPES or (filename or "").lower().endswith(".csv"):
+        return "csv"
+    if mimetype in NDJSON_TYPES or (filename or "").lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+def iter_records(stream: IO[bytes], fmt: str) -> Iterator[tuple[int, Union[dict, str]]]:
+    """Yield (row number, record) while reading the body; bad lines yield an error string instead."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        if not reader.fieldnames:
+            raise BulkFormatError("CSV body has no header row")
+        for number, row in enumerate(reader, start=1):
+            if None in row:
+                yield number, "Too many columns"
+            else:
+                yield number, row
+        return
+    number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield number, "Invalid JSON"
+            continue
+        yield number, record if isinstance(record, dict) else "Expected a JSON object"
+
+
+def _field(record: dict, name: str):
+    if name in record:
+        return record[name]
+    for key, value in record.items():
+        if isinstance(key, str) and key.strip().lower() in _ALIASES[name]:
+            return value
+    return None
+
+
+def _parse_bool(value) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes", "y"):
+        return True
+    if text in ("0", "false", "no", "n"):
+        return False
+    return None
+
+
+def validate(record: dict) -> Union[dict, str]:
+    """Normalize one record to inventory columns, or return the reason it is rejected."""
+    crop_name = str(_field(record, "cropName") or "").strip()
+    if not crop_name:
+        return "Missing cropName"
+    if len(crop_name) > MAX_CROP_NAME:
+        return f"cropName longer than {MAX_CROP_NAME} characters"
+    try:
+        price = float(_field(record, "price"))
+    except (TypeError, ValueError):
+        return "Invalid price"
+    if not math.isfinite(price) or price <= 0:
+        return "Price must be a positive number"
+    raw_quantity = _field(record, "quantity")
+    try:
+        quantity = int(raw_quantity)
+        if isinstance(raw_quantity, float) and not raw_quantity.is_integer():
+            raise ValueError
+    except (TypeError, ValueError):
+        return "Invalid quantity"
+    if quantity < 0:
+        return "Quantity cannot be negative"
+    row = {"crop_name": crop_name, "price": price, "quantity": quantity}
+    image_url = _field(record, "imageUrl")
+    if image_url not in (None, ""):
+        if len(str(image_url)) > MAX_IMAGE_URL:
+            return f"imageUrl longer than {MAX_IMAGE_URL} characters"
+        row["image_url"] = str(image_url)
+    available = _field(record, "available")
+    if available not in (None, ""):
+        parsed = _parse_bool(available)
+        if parsed is None:
+            return "Invalid available flag"
+        row["available"] = parsed
+    return row
@@ -0,0 +1,87 @@
+from typing import Optional
+
+import click
+from flask import Flask, current_app
+from flask.cli import AppGroup
+
+from .extensions import db
+
+
+@click.command("init-db")
+def init_db() -> None:
+    """Create missing tables, indexes and the crop search index."""
+    from .schema import ensure_schema
+
+    ensure_schema(db.engine)
+    click.echo("Database schema is up to date.")
+
+
+rollups_cli = AppGroup("rollups", help="Maintain the admin dashboard rollup tables.")
+
+
+@rollups_cli.command("rebuild")
+def rebuild_rollups() -> None:
+    """Recompute all rollups from orders and users (backfill)."""
+    from .rollups import rebuild
+
+    rebuild()
+    db.session.commit()
+    click.echo("Rollups rebuilt.")
+
+
+uploads_cli = AppGroup("uploads", help="Manage files in UPLOAD_FOLDER.")
+
+
+@uploads_cli.command("gc")
+@click.option("--dry-run", is_flag=True, help="List what would be removed without deleting.")
+@click.option("--min-age", type=float, default=None,
+              help="Only remove files untouched for this many seconds (default: JOB_RESULT_TTL).")
+def gc_uploads(dry_run: bool, min_age: Optional[float]) -> None:
+    """Remove uploads no longer referenced by inventory or retained analysis jobs."""
+    from .jobs import job_queue
+    from .models import Inventory
+    from .storage import collect_garbage, upload_name
+
+    referenced: set[str] = set()
+    for (url,) in db.session.query(Inventory.image_url).filter(Inventory.image_url.isnot(None)).yield_per(1000):
+        name = upload_name(url)
+        if name:
+            referenced.add(name)
+    for _kind, payload, result in job_queue.iter_retained():
+        if payload.get("filename"):
+            referenced.add(payload["filename"])
+        referenced.update(payload.get("filenames") or ())
+        result = result or {}
+        for url in [result.get("editedImage"), *(result.get("editedImages") or ())]:
+            name = upload_name(url)
+            if name:
+                referenced.add(name)
+
+    # Analysis responses point at their upload without persisting it anywhere,
+    # so anything younger than the result TTL is kept as well
+    if min_age is None:
+        min_age = float(current_app.config.get("JOB_RESULT_TTL", 3600))
+    removed, freed = collect_garbage(current_app.config["UPLOAD_FOLDER"], referenced, min_age, dry_run=dry_run)
+    for name in removed:
+        click.echo(name)
+    verb = "Would remove" if dry_run else "Removed"
+    click.echo(f"{verb} {len(removed)} file(s), {freed} bytes; {len(referenced)} referenced.")
+
+
+@click.command("profile-token")
+@click.option("--ttl", type=float, default=300, help="Seconds the token stays valid.")
+def profile_token(ttl: float) -> None:
+    """Print an X-Profile-Token header value that profiles any request sending it."""
+    from .profiling import sign_token
+
+    secret = current_app.config.get("PROFILE_SECRET")
+    if not secret:
+        raise click.ClickException("PROFILE_SECRET is not set")
+    click.echo(sign_token(secret, ttl))
+
+
+def register_commands(app: Flask) -> None:
+    app.cli.add_command(init_db)
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(uploads_cli)
+    app.cli.add_command(profile_token)
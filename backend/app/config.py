@@ -9,10 +9,90 @@ class Config:
         "sqlite:///farmigo.db",
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # "orjson" (used when installed) or "stdlib"
+    JSON_PROVIDER = os.getenv("JSON_PROVIDER", "orjson")
+    # Engine tuning: "auto" (by URL), "sqlite" (WAL + PRAGMAs on connect), "server" (MySQL/Postgres pool) or "none"
+    DB_ENGINE_PROFILE = os.getenv("DB_ENGINE_PROFILE", "auto")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_FOREIGN_KEYS = os.getenv("SQLITE_FOREIGN_KEYS", "1").lower() in ("1", "true", "yes")
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "280"))
+    # Create missing tables/indexes on every boot instead of via `flask init-db`
+    DB_AUTO_CREATE = os.getenv("DB_AUTO_CREATE", "").lower() in ("1", "true", "yes")
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-jwt-secret")
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*")
     UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "uploads")))
     OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY", "")
+    OPENWEATHER_BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "https://api.openweathermap.org/data/2.5")
+    # Weather lookups: fresh for WEATHER_CACHE_TTL seconds, served stale (while refreshing) up to WEATHER_STALE_TTL
+    WEATHER_CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL", "600"))
+    WEATHER_STALE_TTL = int(os.getenv("WEATHER_STALE_TTL", "3600"))
+    WEATHER_CACHE_SIZE = int(os.getenv("WEATHER_CACHE_SIZE", "1024"))
+    WEATHER_TIMEOUT = float(os.getenv("WEATHER_TIMEOUT", "4"))
+    # POST /api/ai/recommend-crop/batch: concurrent lookups per worker, locations per call, overall deadline (s)
+    WEATHER_BATCH_WORKERS = int(os.getenv("WEATHER_BATCH_WORKERS", "8"))
+    RECOMMEND_BATCH_MAX = int(os.getenv("RECOMMEND_BATCH_MAX", "50"))
+    RECOMMEND_BATCH_DEADLINE = float(os.getenv("RECOMMEND_BATCH_DEADLINE", "6"))
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+    # Chatbot backend: "gemini", or "fake" for a local stand-in during development and benchmarks
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+    # Chatbot answer cache shared by all workers; path defaults to <instance>/answer_cache.db
+    ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "")
+    ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+    # Opt-in: also match reworded questions ("how do I treat the tomato blights" ~ "how do I treat blight on tomato")
+    ANSWER_CACHE_FUZZY = os.getenv("ANSWER_CACHE_FUZZY", "0").lower() in ("1", "true", "yes")
+    # POST /api/farmer/inventory/bulk: rows per request and rows per INSERT/UPDATE batch
+    INVENTORY_BULK_MAX_ROWS = int(os.getenv("INVENTORY_BULK_MAX_ROWS", "5000"))
+    INVENTORY_BULK_CHUNK_SIZE = int(os.getenv("INVENTORY_BULK_CHUNK_SIZE", "500"))
+    # Cached public catalogue responses (market, crops): "sqlite" (shared by workers), "memory" (single worker) or "off"
+    RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "sqlite")
+    RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "")
+    RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+    # Load the image-edit pipeline when the worker boots instead of on first request
+    QWEN_PRELOAD = os.getenv("QWEN_PRELOAD", "").lower() in ("1", "true", "yes")
+    # Seconds a request waits for the (single) pipeline before giving up; empty waits forever
+    QWEN_ACQUIRE_TIMEOUT = os.getenv("QWEN_ACQUIRE_TIMEOUT", "")
+    # After a failed load, requests fail fast for this many seconds before the next load attempt
+    QWEN_LOAD_RETRY_SECONDS = float(os.getenv("QWEN_LOAD_RETRY_SECONDS", "300"))
+    # Images per pipeline call in batch disease analysis, and images accepted per batch request
+    QWEN_BATCH_SIZE = int(os.getenv("QWEN_BATCH_SIZE", "4"))
+    DISEASE_BATCH_MAX = int(os.getenv("DISEASE_BATCH_MAX", "32"))
+    # Default edit profile (quality, fast, preview); empty picks "quality" on GPU and "fast" on CPU.
+    # QWEN_PROFILES is JSON overriding or adding profiles, e.g. {"fast": {"steps": 10}}
+    QWEN_PROFILE = os.getenv("QWEN_PROFILE", "")
+    QWEN_PROFILES = os.getenv("QWEN_PROFILES", "")
+    # torch threads for image edits; 0 uses every core available to the process
+    QWEN_NUM_THREADS = int(os.getenv("QWEN_NUM_THREADS", "0"))
+    QWEN_COMPILE = os.getenv("QWEN_COMPILE", "").lower() in ("1", "true", "yes")
+    # Background jobs (image edits); JOB_DB_PATH defaults to <instance>/jobs.db
+    JOB_DB_PATH = os.getenv("JOB_DB_PATH", "")
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+    JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", "16"))
+    JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "3600"))
+    # A running job whose worker stops renewing it for this long is requeued, up to JOB_MAX_ATTEMPTS runs
+    JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+    # Resized upload variants (/uploads/<file>?w=320&fmt=webp); dir defaults to <UPLOAD_FOLDER>/.variants
+    VARIANT_CACHE_DIR = os.getenv("VARIANT_CACHE_DIR", "")
+    VARIANT_CACHE_MAX_BYTES = int(os.getenv("VARIANT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    # Offload upload bytes to a front proxy: an nginx internal location aliased to UPLOAD_FOLDER
+    # (e.g. "/_uploads/") for X-Accel-Redirect, or X-Sendfile for Apache/lighttpd
+    UPLOADS_ACCEL_REDIRECT = os.getenv("UPLOADS_ACCEL_REDIRECT", "")
+    USE_X_SENDFILE = os.getenv("USE_X_SENDFILE", "").lower() in ("1", "true", "yes")
+    # Prometheus metrics at /api/metrics (needs prometheus-client); METRICS_TOKEN, if set, is required as a Bearer token
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+    # Per-request profiling: X-Profile-Token signed with PROFILE_SECRET (`flask profile-token`), or
+    # ?_profile=1 (sampling) / ?_profile=cprofile from an admin. PROFILE_SAMPLE_RATE=N profiles 1 in N requests.
+    PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+    PROFILE_SAMPLE_RATE = int(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    PROFILE_MAX_BYTES = int(os.getenv("PROFILE_MAX_BYTES", str(50 * 1024 * 1024)))
 
 
@@ -2,8 +2,72 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_migrate import Migrate
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 
 db = SQLAlchemy()
 jwt = JWTManager()
 cors = CORS()
-migrate = Migrate()
\ No newline at end of file
+migrate = Migrate()
+
+
+def engine_profile(app) -> str:
+    """"sqlite", "server" (MySQL/Postgres pooling) or "none"; DB_ENGINE_PROFILE=auto picks by URL."""
+    profile = (app.config.get("DB_ENGINE_PROFILE") or "auto").lower()
+    if profile != "auto":
+        return profile
+    backend = make_url(app.config["SQLALCHEMY_DATABASE_URI"]).get_backend_name()
+    return "sqlite" if backend == "sqlite" else "server"
+
+
+def engine_options(app) -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS for the selected profile; explicit options in config win."""
+    profile = engine_profile(app)
+    options: dict = {}
+    if profile == "server":
+        options = {
+            "pool_size": int(app.config.get("DB_POOL_SIZE", 5)),
+            "max_overflow": int(app.config.get("DB_MAX_OVERFLOW", 10)),
+            "pool_timeout": float(app.config.get("DB_POOL_TIMEOUT", 30)),
+            # Below MySQL's wait_timeout and typical proxy idle cut-offs
+            "pool_recycle": int(app.config.get("DB_POOL_RECYCLE", 280)),
+            "pool_pre_ping": True,
+        }
+    elif profile == "sqlite":
+        # The driver's own lock wait; busy_timeout below covers the same for every statement
+        options = {"connect_args": {"timeout": int(app.config.get("SQLITE_BUSY_TIMEOUT_MS", 5000)) / 1000}}
+    options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    return options
+
+
+def _sqlite_pragmas(app):
+    busy_timeout = int(app.config.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    mmap_size = int(app.config.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    foreign_keys = bool(app.config.get("SQLITE_FOREIGN_KEYS", True))
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            # WAL lets readers run alongside the single writer; it is a property of
+            # the file, so this only changes anything on the first connection.
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+            # Durable at checkpoints rather than every commit; safe with WAL
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA mmap_size={mmap_size}")
+            cursor.execute(f"PRAGMA foreign_keys={'ON' if foreign_keys else 'OFF'}")
+        finally:
+            cursor.close()
+
+    return on_connect
+
+
+def init_engine_profile(app) -> None:
+    """Install per-connection setup for the profile; call after db.init_app inside create_app."""
+    if engine_profile(app) != "sqlite":
+        return
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return
+    with app.app_context():
+        event.listen(db.engine, "connect", _sqlite_pragmas(app))
@@ -0,0 +1,43 @@
+from typing import Optional, Sequence
+
+LAYOUTS = ("rows", "columns")
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def requested_fields(available: Sequence[str], raw: Optional[str]) -> Optional[list[str]]:
+    """Parse `?fields=a,b`; None when absent. Unknown names are an error, duplicates are dropped."""
+    if raw is None:
+        return None
+    names = []
+    for name in raw.split(","):
+        name = name.strip()
+        if not name or name in names:
+            continue
+        if name not in available:
+            raise InvalidFields(f"Unknown field '{name}', expected any of {', '.join(available)}")
+        names.append(name)
+    if not names:
+        raise InvalidFields("fields is empty")
+    return names
+
+
+def requested_layout(raw: Optional[str]) -> str:
+    layout = (raw or "rows").lower()
+    if layout not in LAYOUTS:
+        raise InvalidFields(f"Invalid layout, expected one of {', '.join(LAYOUTS)}")
+    return layout
+
+
+def shape(rows: Sequence[Sequence], names: Sequence[str], layout: str, key: str = "items") -> dict:
+    """Flat rows (tuples in `names` order) as `{key: [{...}]}` or column-oriented `{"columns": {name: [...]}}`.
+
+    The column layout names each field once instead of once per row, which
+    saves serializer time and bytes on large pages.
+    """
+    if layout == "columns":
+        columns = list(zip(*rows)) if rows else [()] * len(names)
+        return {"columns": {name: list(values) for name, values in zip(names, columns)}, "count": len(rows)}
+    return {key: [dict(zip(names, row)) for row in rows]}
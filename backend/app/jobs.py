@@ -0,0 +1,340 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+from uuid import uuid4
+
+from flask import Flask
+
+log = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobCancelled(Exception):
+    pass
+
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner TEXT,
+    heartbeat_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at);
+"""
+# Columns added after the first release; older jobs.db files are migrated on connect
+_LEASE_COLUMNS = {"owner": "TEXT", "heartbeat_at": "REAL", "attempts": "INTEGER NOT NULL DEFAULT 0"}
+
+
+class JobContext:
+    def __init__(self, queue: "JobQueue", job_id: str):
+        self.queue = queue
+        self.job_id = job_id
+
+    def cancelled(self) -> bool:
+        with self.queue._connect() as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (self.job_id,)).fetchone()
+        return bool(row and row[0])
+
+
+class JobQueue:
+    """Background jobs stored in a SQLite file and run by a small thread pool.
+
+    Every gunicorn worker shares the same file, so any worker can answer a
+    status poll and any worker with free threads can pick up a queued job.
+    Handlers are registered per job kind and receive the JSON payload plus a
+    JobContext for cooperative cancellation; their return value is stored as the result.
+
+    A running job holds a lease that its process renews every `lease / 3`
+    seconds. When a worker dies mid-job the lease expires and the job is
+    requeued, or failed once it has used up `max_attempts`.
+    """
+
+    def __init__(self):
+        self.path: Optional[str] = None
+        self.workers = 1
+        self.max_depth = 16
+        self.result_ttl = 3600.0
+        self.poll_interval = 0.5
+        self.lease = 120.0
+        self.max_attempts = 2
+        self._owner: Optional[str] = None
+        self._handlers: dict[str, Callable[[dict, JobContext], Any]] = {}
+        self._wakeup = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._started_pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+        self._schema_ready = False
+
+    def configure(self, path: str, workers: int = 1, max_depth: int = 16, result_ttl: float = 3600.0,
+                  lease: float = 120.0, max_attempts: int = 2) -> None:
+        self.path = path
+        self.workers = max(1, workers)
+        self.max_depth = max(1, max_depth)
+        self.result_ttl = result_ttl
+        self.lease = max(1.0, lease)
+        self.max_attempts = max(1, max_attempts)
+        self._schema_ready = False
+
+    @contextmanager
+    def _connect(self):
+        if not self.path:
+            raise RuntimeError("Job queue is not configured")
+        # The file is created on first use rather than at boot, keeping cold starts cheap
+        if not self._schema_ready:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            if not self._schema_ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+                for name, decl in _LEASE_COLUMNS.items():
+                    if name not in columns:
+                        conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {decl}")
+                self._schema_ready = True
+            yield conn
+        finally:
+            conn.close()
+
+    def handler(self, kind: str):
+        def register(fn: Callable[[dict, JobContext], Any]):
+            self._handlers[kind] = fn
+            return fn
+        return register
+
+    def start(self) -> None:
+        """Start this process's worker pool, which also resumes queued and orphaned jobs."""
+        self._ensure_workers()
+
+    def _ensure_workers(self) -> None:
+        # Threads do not survive fork, so each gunicorn worker starts its own pool
+        if self._started_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._started_pid == os.getpid():
+                return
+            # Unique per process start: pids are reused after restarts, especially in containers
+            self._owner = f"{os.getpid()}-{uuid4().hex[:8]}"
+            try:
+                with self._connect() as conn:
+                    self._reclaim(conn)
+            except sqlite3.Error:
+                log.exception("could not reclaim expired jobs")
+            self._threads = [
+                threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            self._threads.append(threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True))
+            for thread in self._threads:
+                thread.start()
+            self._started_pid = os.getpid()
+
+    def submit(self, kind: str, payload: dict) -> dict:
+        if kind not in self._handlers:
+            raise KeyError(kind)
+        self._ensure_workers()
+        job_id = uuid4().hex
+        with self._connect() as conn:
+            self._purge(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            self._reclaim(conn)
+            # Running jobs whose lease lapsed belong to a dead worker and take no capacity
+            depth = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? OR (status = ? AND heartbeat_at >= ?)",
+                (QUEUED, RUNNING, time.time() - self.lease),
+            ).fetchone()[0]
+            if depth >= self.max_depth:
+                conn.execute("ROLLBACK")
+                raise JobQueueFull(f"{depth} jobs pending")
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), QUEUED, time.time()),
+            )
+            conn.execute("COMMIT")
+        self._wakeup.set()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        # A poll may be the first call after a restart; it must not wait on a new submission
+        self._ensure_workers()
+        with self._connect() as conn:
+            self._purge(conn)
+            row = conn.execute(
+                "SELECT id, kind, status, result, error, created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+            position = None
+            if row and row[2] == QUEUED:
+                position = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < ?", (QUEUED, row[5])
+                ).fetchone()[0]
+        if not row:
+            return None
+        return {
+            "id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "result": json.loads(row[3]) if row[3] else None,
+            "error": row[4],
+            "createdAt": row[5],
+            "startedAt": row[6],
+            "finishedAt": row[7],
+            "queuePosition": position,
+        }
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        self._ensure_workers()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, cancel_requested = 1 WHERE id = ? AND status = ?",
+                (CANCELLED, time.time(), job_id, QUEUED),
+            )
+            # Running jobs stop at their next cancellation check
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?", (job_id, RUNNING))
+        return self.get(job_id)
+
+    def iter_retained(self):
+        """Yield (kind, payload, result) for every job that has not expired yet."""
+        with self._connect() as conn:
+            self._purge(conn)
+            rows = conn.execute("SELECT kind, payload, result FROM jobs").fetchall()
+        for kind, payload, result in rows:
+            yield kind, json.loads(payload), json.loads(result) if result else None
+
+    def _purge(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?",
+            (DONE, FAILED, CANCELLED, time.time() - self.result_ttl),
+        )
+
+    def _reclaim(self, conn: sqlite3.Connection) -> None:
+        """Requeue running jobs whose lease expired, or fail them after max_attempts."""
+        now = time.time()
+        cutoff = now - self.lease
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ?, owner = NULL "
+            "WHERE status = ? AND heartbeat_at < ? AND attempts >= ?",
+            (FAILED, "Worker stopped while running this job", now, RUNNING, cutoff, self.max_attempts),
+        )
+        conn.execute(
+            "UPDATE jobs SET status = ?, started_at = NULL, owner = NULL WHERE status = ? AND heartbeat_at < ?",
+            (QUEUED, RUNNING, cutoff),
+        )
+        # Rows left RUNNING by a release without leases never got a heartbeat
+        conn.execute(
+            "UPDATE jobs SET status = ?, started_at = NULL WHERE status = ? AND heartbeat_at IS NULL AND started_at < ?",
+            (QUEUED, RUNNING, cutoff),
+        )
+
+    def _claim(self) -> Optional[tuple[str, str, dict]]:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._reclaim(conn)
+            row = conn.execute(
+                "SELECT id, kind, payload FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row:
+                now = time.time()
+                conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = ?, owner = ?, heartbeat_at = ?, attempts = attempts + 1 "
+                    "WHERE id = ?",
+                    (RUNNING, now, self._owner, now, row[0]),
+                )
+            conn.execute("COMMIT")
+        return (row[0], row[1], json.loads(row[2])) if row else None
+
+    def _heartbeat(self) -> None:
+        while True:
+            time.sleep(self.lease / 3)
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status = ?",
+                        (time.time(), self._owner, RUNNING),
+                    )
+            except sqlite3.Error:
+                log.exception("job heartbeat failed")
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        # Only the lease holder may finish the job; a reclaimed one belongs to someone else now
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, owner = NULL "
+                "WHERE id = ? AND owner = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id, self._owner),
+            )
+
+    def _finish_safely(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        for attempt in range(5):
+            try:
+                self._finish(job_id, status, result, error)
+                return
+            except sqlite3.Error as e:
+                last_error = e
+                time.sleep(0.2 * 2 ** attempt)
+        # Give up; the lease expires and _reclaim retries or fails the job
+        log.error("could not record %s for job %s: %s", status, job_id, last_error)
+
+    def _work(self) -> None:
+        while True:
+            try:
+                claimed = self._claim()
+            except sqlite3.Error:
+                claimed = None
+            if not claimed:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            job_id, kind, payload = claimed
+            ctx = JobContext(self, job_id)
+            try:
+                result = self._handlers[kind](payload, ctx)
+            except JobCancelled:
+                self._finish_safely(job_id, CANCELLED)
+            except Exception as e:
+                self._finish_safely(job_id, FAILED, error=str(e))
+            else:
+                try:
+                    cancelled = ctx.cancelled()
+                except sqlite3.Error:
+                    cancelled = False
+                self._finish_safely(job_id, CANCELLED if cancelled else DONE, result=result)
+
+
+job_queue = JobQueue()
+
+
+def init_app(app: Flask) -> None:
+    path = app.config.get("JOB_DB_PATH") or os.path.join(app.instance_path, "jobs.db")
+    job_queue.configure(
+        path,
+        workers=int(app.config.get("JOB_WORKERS", 1)),
+        max_depth=int(app.config.get("JOB_MAX_QUEUE", 16)),
+        result_ttl=float(app.config.get("JOB_RESULT_TTL", 3600)),
+        lease=float(app.config.get("JOB_LEASE_SECONDS", 120)),
+        max_attempts=int(app.config.get("JOB_MAX_ATTEMPTS", 2)),
+    )
@@ -0,0 +1,56 @@
+from typing import Any
+
+from flask import Flask, Response
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    # Optional: without orjson the app keeps Flask's stdlib provider
+    import orjson
+except ImportError:  # pragma: no cover - depends on the deployment
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Response bodies are produced as bytes in one call, with no str round trip.
+    Types orjson does not know, including datetimes (kept as HTTP dates, like
+    Flask), go through Flask's `default`. Calls that pass stdlib-only keyword
+    arguments (`cls=`, `indent=`, ...) are forwarded to the stdlib provider.
+    """
+
+    # Insertion order is what the views build; sorting every response is wasted work
+    sort_keys = False
+
+    def _option(self) -> int:
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._option()).decode()
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self._option() | orjson.OPT_APPEND_NEWLINE
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(orjson.dumps(obj, default=self.default, option=option), mimetype=self.mimetype)
+
+
+def orjson_available() -> bool:
+    return orjson is not None
+
+
+def init_app(app: Flask) -> None:
+    # JSON_PROVIDER=stdlib opts out; orjson is used whenever it is installed
+    if (app.config.get("JSON_PROVIDER") or "orjson").lower() == "orjson" and orjson is not None:
+        app.json = OrjsonProvider(app)
@@ -0,0 +1,104 @@
+from typing import IO, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+from PIL import Image  # type: ignore
+
+# Images are analysed at most this many pixels on the long side
+ANALYSIS_SIZE = 256
+# Below this share of green pixels the upload is treated as "no leaf"
+LEAF_RATIO_THRESHOLD = 0.04
+# Rows/columns need at least this share of green pixels to count towards the bounding box
+_BOX_LINE_RATIO = 0.02
+
+
+class LeafDetection(NamedTuple):
+    detected: bool
+    ratio: float
+    # (left, top, right, bottom) in original image pixels, or None when nothing is green
+    bbox: Optional[tuple[int, int, int, int]]
+
+
+def load_for_analysis(source: Union[str, IO[bytes]], size: int = ANALYSIS_SIZE) -> tuple[np.ndarray, tuple[int, int]]:
+    """Decode `source` scaled down to fit `size` and return (HxWx3 uint8 array, original (w, h))."""
+    with Image.open(source) as img:
+        original_size = img.size
+        # JPEG can decode straight to 1/2, 1/4 or 1/8 scale, skipping most of the work
+        img.draft("RGB", (size, size))
+        img = img.convert("RGB")
+        img.thumbnail((size, size), Image.Resampling.BILINEAR)
+        return np.asarray(img), original_size
+
+
+def green_mask(rgb: np.ndarray) -> np.ndarray:
+    """Boolean mask of leaf-green pixels for one image (H, W, 3) or a stack (N, H, W, 3)."""
+    rgb = rgb.astype(np.int16, copy=False)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    return (g > r + 15) & (g > b + 15) & (g > 60)
+
+
+def _bbox(mask: np.ndarray, original_size: tuple[int, int]) -> Optional[tuple[int, int, int, int]]:
+    height, width = mask.shape
+    rows = np.flatnonzero(mask.mean(axis=1) >= _BOX_LINE_RATIO)
+    cols = np.flatnonzero(mask.mean(axis=0) >= _BOX_LINE_RATIO)
+    if not rows.size or not cols.size:
+        return None
+    sx = original_size[0] / width
+    sy = original_size[1] / height
+    return (
+        int(cols[0] * sx),
+        int(rows[0] * sy),
+        min(original_size[0], int(np.ceil((cols[-1] + 1) * sx))),
+        min(original_size[1], int(np.ceil((rows[-1] + 1) * sy))),
+    )
+
+
+def analyse(rgb: np.ndarray, original_size: tuple[int, int], threshold: float = LEAF_RATIO_THRESHOLD) -> LeafDetection:
+    mask = green_mask(rgb)
+    ratio = float(mask.mean()) if mask.size else 0.0
+    return LeafDetection(detected=ratio >= threshold, ratio=ratio, bbox=_bbox(mask, original_size))
+
+
+def detect_leaf(source: Union[str, IO[bytes]], threshold: float = LEAF_RATIO_THRESHOLD) -> LeafDetection:
+    rgb, original_size = load_for_analysis(source)
+    return analyse(rgb, original_size, threshold)
+
+
+def detect_leaves(sources: Sequence[Union[str, IO[bytes]]],
+                  threshold: float = LEAF_RATIO_THRESHOLD) -> list[Optional[LeafDetection]]:
+    """Leaf check for many images; None for sources that cannot be decoded.
+
+    Thumbnails are padded into one (N, H, W, 3) stack so the green mask is a
+    single vectorized pass. Padding is black, never green, so each ratio is
+    taken over the image's own pixels only.
+    """
+    decoded: list[Optional[tuple[np.ndarray, tuple[int, int]]]] = []
+    for source in sources:
+        try:
+            decoded.append(load_for_analysis(source))
+        except (OSError, ValueError, Image.DecompressionBombError):
+            decoded.append(None)
+    images = [d for d in decoded if d is not None]
+    if not images:
+        return [None] * len(decoded)
+
+    height = max(rgb.shape[0] for rgb, _ in images)
+    width = max(rgb.shape[1] for rgb, _ in images)
+    stack = np.zeros((len(images), height, width, 3), dtype=np.uint8)
+    for i, (rgb, _) in enumerate(images):
+        stack[i, :rgb.shape[0], :rgb.shape[1]] = rgb
+    masks = green_mask(stack)
+    counts = masks.reshape(len(images), -1).sum(axis=1)
+
+    results: list[Optional[LeafDetection]] = []
+    i = 0
+    for item in decoded:
+        if item is None:
+            results.append(None)
+            continue
+        rgb, original_size = item
+        h, w = rgb.shape[:2]
+        ratio = float(counts[i]) / (h * w) if h * w else 0.0
+        results.append(LeafDetection(detected=ratio >= threshold, ratio=ratio,
+                                     bbox=_bbox(masks[i, :h, :w], original_size)))
+        i += 1
+    return results
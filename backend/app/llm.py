@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from typing import Iterator, Optional, Protocol
+
+from flask import Flask
+
+
+class LLMNotConfigured(Exception):
+    pass
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMBackend(Protocol):
+    label: str
+    model_name: str
+
+    def generate(self, prompt: str) -> str: ...
+
+    def stream(self, prompt: str) -> Iterator[str]: ...
+
+
+def _chunk_text(resp) -> Optional[str]:
+    try:
+        text = getattr(resp, "text", None)
+    except ValueError:  # raised by the SDK when a chunk has no text parts
+        text = None
+    if not text and getattr(resp, "candidates", None):
+        try:
+            text = resp.candidates[0].content.parts[0].text
+        except Exception:
+            text = None
+    return text
+
+
+class GeminiBackend:
+    label = "Gemini"
+
+    def __init__(self, api_key: str, model_name: str):
+        import google.generativeai as genai  # type: ignore
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self._model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str) -> str:
+        text = _chunk_text(self._model.generate_content(prompt))
+        if not text:
+            raise LLMError("Gemini returned no content")
+        return text
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self._model.generate_content(prompt, stream=True):
+            text = _chunk_text(chunk)
+            if text:
+                yield text
+
+
+class FakeLLMBackend:
+    """Local stand-in: answers instantly-ish with a canned reply, streamed word by word."""
+
+    label = "Fake LLM"
+
+    def __init__(self, delay: float = 0.02, model_name: str = "fake-llm"):
+        self.delay = delay
+        self.model_name = model_name
+        self.calls = 0
+
+    def _answer(self, prompt: str) -> str:
+        return f"For '{prompt.strip()}': inspect the leaves, keep watering even and consult your local extension officer."
+
+    def generate(self, prompt: str) -> str:
+        self.calls += 1
+        time.sleep(self.delay * 10)
+        return self._answer(prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        self.calls += 1
+        words = self._answer(prompt).split(" ")
+        for i, word in enumerate(words):
+            time.sleep(self.delay)
+            yield word if i == 0 else f" {word}"
+
+
+_backend: Optional[LLMBackend] = None
+_backend_lock = threading.Lock()
+_backend_name = "gemini"
+
+
+def set_llm_backend(backend: Optional[LLMBackend]) -> None:
+    """Install a backend for this worker (None rebuilds from config on next use)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def get_llm_backend() -> LLMBackend:
+    """The worker's chat backend, built once on first use."""
+    global _backend
+    if _backend is not None:
+        return _backend
+    with _backend_lock:
+        if _backend is None:
+            if _backend_name == "fake":
+                _backend = FakeLLMBackend(delay=float(os.getenv("FAKE_LLM_DELAY", "0.02")))
+            else:
+                gemini_key = os.getenv("GEMINI_API_KEY", "").strip()
+                if not gemini_key:
+                    raise LLMNotConfigured("GEMINI_API_KEY not configured on server")
+                _backend = GeminiBackend(gemini_key, os.getenv("GEMINI_MODEL", "gemini-1.5-flash"))
+    return _backend
+
+
+def init_app(app: Flask) -> None:
+    global _backend_name
+    _backend_name = (app.config.get("LLM_BACKEND") or "gemini").lower()
+    set_llm_backend(None)
@@ -0,0 +1,129 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from flask import Flask, Response, current_app, g, request
+
+from .sql_timing import add_observer
+
+try:
+    # Optional: without prometheus_client the hooks are no-ops and /api/metrics answers 503
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+except ImportError:  # pragma: no cover - depends on the deployment
+    prometheus_client = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+UPLOAD_BUCKETS = (16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2)
+AI_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+if prometheus_client is not None:
+    # Metric objects live at module level; under PROMETHEUS_MULTIPROC_DIR (set by
+    # gunicorn.conf.py before the app is imported) each worker writes its own mmap files.
+    HTTP_REQUESTS = Counter(
+        "farmigo_http_requests_total", "HTTP requests by route and status",
+        ["blueprint", "endpoint", "method", "status"],
+    )
+    HTTP_LATENCY = Histogram(
+        "farmigo_http_request_duration_seconds", "Time to produce the response (first byte for streams)",
+        ["blueprint", "endpoint", "method"], buckets=LATENCY_BUCKETS,
+    )
+    DB_QUERIES = Histogram(
+        "farmigo_db_queries_per_request", "SQL statements executed per request",
+        ["endpoint"], buckets=QUERY_COUNT_BUCKETS,
+    )
+    DB_TIME = Histogram(
+        "farmigo_db_time_per_request_seconds", "Time spent in SQL per request",
+        ["endpoint"], buckets=LATENCY_BUCKETS,
+    )
+    UPLOAD_BYTES = Histogram(
+        "farmigo_upload_bytes", "Size of multipart upload requests",
+        ["endpoint"], buckets=UPLOAD_BUCKETS,
+    )
+    AI_LATENCY = Histogram(
+        "farmigo_ai_backend_seconds", "Latency of AI backend calls",
+        ["backend", "operation", "outcome"], buckets=AI_BUCKETS,
+    )
+
+
+def metrics_available() -> bool:
+    return prometheus_client is not None
+
+
+def _labels() -> tuple[str, str]:
+    # Unmatched URLs share one label so 404 scans cannot blow up series cardinality
+    return request.blueprint or "app", request.endpoint or "unmatched"
+
+
+def _before_request() -> None:
+    g._metrics_started = time.perf_counter()
+    g._metrics_db = [0, 0.0]
+
+
+def _after_request(response: Response) -> Response:
+    started = g.pop("_metrics_started", None)
+    db_stats = g.pop("_metrics_db", None)
+    if started is None or request.endpoint == "metrics":
+        return response
+    blueprint, endpoint = _labels()
+    HTTP_LATENCY.labels(blueprint, endpoint, request.method).observe(time.perf_counter() - started)
+    HTTP_REQUESTS.labels(blueprint, endpoint, request.method, str(response.status_code)).inc()
+    if db_stats is not None:
+        DB_QUERIES.labels(endpoint).observe(db_stats[0])
+        DB_TIME.labels(endpoint).observe(db_stats[1])
+    if request.mimetype == "multipart/form-data" and request.content_length:
+        UPLOAD_BYTES.labels(endpoint).observe(request.content_length)
+    return response
+
+
+def _observe_query(statement: str, elapsed: float, executemany: bool) -> None:
+    db_stats = g.get("_metrics_db")
+    if db_stats is not None:
+        db_stats[0] += 1
+        db_stats[1] += elapsed
+
+
+@contextmanager
+def track_ai(backend: str, operation: str) -> Iterator[None]:
+    """Time an AI backend call (LLM generate/stream, image edit) into farmigo_ai_backend_seconds."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        if prometheus_client is not None:
+            AI_LATENCY.labels(backend, operation, outcome).observe(time.perf_counter() - started)
+
+
+def render() -> tuple[bytes, str]:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Aggregate every live (and exited) worker's files, not just this process
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def metrics_view():
+    if prometheus_client is None:
+        return {"error": "Metrics unavailable: install prometheus-client"}, 503
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return {"error": "Unauthorized"}, 401
+    body, content_type = render()
+    return Response(body, content_type=content_type)
+
+
+def init_app(app: Flask) -> None:
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    app.add_url_rule("/api/metrics", endpoint="metrics", view_func=metrics_view)
+    if prometheus_client is None:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    add_observer(_observe_query)
@@ -46,6 +46,14 @@ class Inventory(db.Model):
 
     farmer = db.relationship("User")
 
+    __table_args__ = (
+        # Keyset pagination for the market: newest-first and by price
+        db.Index("ix_inventory_available_id", "available", "id"),
+        db.Index("ix_inventory_available_price_id", "available", "price", "id"),
+        # A farmer's own listings and sales history
+        db.Index("ix_inventory_farmer_id", "farmer_id"),
+    )
+
 
 class Order(db.Model):
     __tablename__ = "orders"
@@ -56,6 +64,11 @@ class Order(db.Model):
 
     customer = db.relationship("User")
 
+    __table_args__ = (
+        # Order history: newest first per customer, keyset on (created_at, id)
+        db.Index("ix_orders_customer_created_id", "customer_id", "created_at", "id"),
+    )
+
 
 class OrderItem(db.Model):
     __tablename__ = "order_items"
@@ -68,4 +81,45 @@ class OrderItem(db.Model):
     order = db.relationship("Order", backref=db.backref("items", lazy=True))
     inventory = db.relationship("Inventory")
 
+    __table_args__ = (
+        db.Index("ix_order_items_order_id", "order_id"),
+        db.Index("ix_order_items_inventory_id", "inventory_id"),
+    )
+
+
+# Rollups read by the admin dashboard. They are maintained in the same
+# transaction as the writes they summarise (see app/rollups.py) and can be
+# recomputed from scratch with `flask rollups rebuild`.
+class SalesDaily(db.Model):
+    __tablename__ = "sales_daily"
+    day = db.Column(db.Date, primary_key=True)
+    total_amount = db.Column(db.Float, nullable=False, default=0.0)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    items_sold = db.Column(db.Integer, nullable=False, default=0)
+
+
+class CropSales(db.Model):
+    __tablename__ = "crop_sales"
+    crop_name = db.Column(db.String(120), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0, index=True)
+
+
+class FarmerSales(db.Model):
+    __tablename__ = "farmer_sales"
+    farmer_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    revenue = db.Column(db.Float, nullable=False, default=0.0, index=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+
+    farmer = db.relationship("User")
+
+
+class UserRoleCount(db.Model):
+    __tablename__ = "user_role_counts"
+    role = db.Column(db.Enum(UserRole), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
 
+class StatTotal(db.Model):
+    __tablename__ = "stat_totals"
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Float, nullable=False, default=0.0)
@@ -0,0 +1,42 @@
+import base64
+from datetime import date, datetime, time
+from typing import Optional
+
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        stamp, _, row_id = raw.partition("|")
+        return datetime.fromisoformat(stamp), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def before_cursor(created_column, id_column, cursor: tuple[datetime, int]):
+    """Rows after `cursor` in (created_at DESC, id DESC) order; written out so indexes apply on every backend."""
+    created_at, row_id = cursor
+    return or_(created_column < created_at, and_(created_column == created_at, id_column < row_id))
+
+
+def parse_date_bound(value: Optional[str], end: bool = False) -> Optional[datetime]:
+    """`YYYY-MM-DD` or an ISO timestamp; a bare date used as an upper bound covers that whole day."""
+    if not value:
+        return None
+    try:
+        if len(value) == 10:
+            day = date.fromisoformat(value)
+            return datetime.combine(day, time.max if end else time.min)
+        return datetime.fromisoformat(value)
+    except ValueError as e:
+        raise ValueError(f"Invalid date: {value}") from e
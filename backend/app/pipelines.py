@@ -0,0 +1,469 @@
+import importlib.util
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Callable, NamedTuple, Optional
+
+from flask import Flask
+
+
+class PipelineBusy(Exception):
+    pass
+
+
+class PipelineLoadFailed(Exception):
+    pass
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except Exception:
+        return None
+
+
+class PipelineRegistry:
+    """Holds one model pipeline per worker process.
+
+    The pipeline is loaded once (lazily on first use, or eagerly via `preload`),
+    warmed up with a dummy call, and handed out to one caller at a time.
+    `override` swaps in any callable with the same interface, e.g. a fake for CPU-only runs.
+    A failed load is not retried for `retry_after` seconds (or until `reset`);
+    callers get PipelineLoadFailed straight away instead of each waiting on a new load.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any], warmup: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self.loader = loader
+        self.warmup = warmup
+        self.acquire_timeout: Optional[float] = None
+        self.retry_after = 300.0
+        self._failed_at: Optional[float] = None
+        self._pipeline: Any = None
+        self._load_lock = threading.Lock()
+        self._use_lock = threading.Lock()
+        self._state = "unloaded"
+        self._error: Optional[str] = None
+        self._load_seconds: Optional[float] = None
+        self._warmup_seconds: Optional[float] = None
+        self._rss_delta: Optional[int] = None
+        self._loaded_at: Optional[float] = None
+        self._device: Optional[str] = None
+        self._calls = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._pipeline is not None
+
+    @property
+    def retry_in(self) -> Optional[float]:
+        """Seconds until a failed load may be retried; None when not backing off."""
+        if self._state != "failed" or self._failed_at is None:
+            return None
+        remaining = self._failed_at + self.retry_after - time.monotonic()
+        return remaining if remaining > 0 else None
+
+    def _check_backoff(self) -> None:
+        remaining = self.retry_in
+        if remaining is not None:
+            raise PipelineLoadFailed(f"{self.name} failed to load ({self._error}); next attempt in {math.ceil(remaining)}s")
+
+    def get(self) -> Any:
+        if self._pipeline is not None:
+            return self._pipeline
+        self._check_backoff()
+        with self._load_lock:
+            if self._pipeline is None:
+                # Re-checked under the lock: callers that queued behind a failing load give up too
+                self._check_backoff()
+                self._load()
+        return self._pipeline
+
+    def _load(self) -> None:
+        self._state = "loading"
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+        try:
+            pipeline = self.loader()
+            self._load_seconds = time.perf_counter() - started
+            if self.warmup:
+                warm_started = time.perf_counter()
+                self.warmup(pipeline)
+                self._warmup_seconds = time.perf_counter() - warm_started
+        except Exception as e:
+            self._state = "failed"
+            self._error = str(e)
+            self._failed_at = time.monotonic()
+            raise
+        rss_after = _rss_bytes()
+        if rss_before is not None and rss_after is not None:
+            self._rss_delta = rss_after - rss_before
+        self._device = str(getattr(pipeline, "device", "cpu"))
+        self._loaded_at = time.time()
+        self._error = None
+        self._failed_at = None
+        self._state = "ready"
+        self._pipeline = pipeline
+
+    def preload(self, background: bool = True) -> None:
+        def _run():
+            try:
+                self.get()
+            except Exception:
+                pass
+
+        if background:
+            threading.Thread(target=_run, name=f"preload-{self.name}", daemon=True).start()
+        else:
+            _run()
+
+    def override(self, pipeline: Any) -> None:
+        with self._load_lock:
+            self._pipeline = pipeline
+            self._state = "ready"
+            self._error = None
+            self._loaded_at = time.time()
+            self._device = str(getattr(pipeline, "device", "cpu"))
+
+    def reset(self) -> None:
+        """Drop the pipeline, and any failed state, so the next use loads it again."""
+        with self._load_lock:
+            self._pipeline = None
+            self._state = "unloaded"
+            self._error = None
+            self._failed_at = None
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        pipeline = self.get()
+        timeout = self.acquire_timeout if timeout is None else timeout
+        if not self._use_lock.acquire(timeout=-1 if timeout is None else timeout):
+            raise PipelineBusy(f"{self.name} is busy")
+        try:
+            self._calls += 1
+            yield pipeline
+        finally:
+            self._use_lock.release()
+
+    def status(self) -> dict:
+        info = {
+            "name": self.name,
+            "state": self._state,
+            "loadSeconds": self._load_seconds,
+            "warmupSeconds": self._warmup_seconds,
+            "rssDeltaBytes": self._rss_delta,
+            "rssBytes": _rss_bytes(),
+            "device": self._device,
+            "loadedAt": self._loaded_at,
+            "calls": self._calls,
+            "busy": self._use_lock.locked(),
+            "error": self._error,
+            "retryInSeconds": round(self.retry_in, 1) if self.retry_in is not None else None,
+        }
+        if self._device and self._device.startswith("cuda"):
+            try:
+                import torch  # type: ignore
+                info["cudaAllocatedBytes"] = torch.cuda.memory_allocated()
+            except Exception:
+                pass
+        return info
+
+
+class FakeEditPipeline:
+    """Tiny stand-in for QwenImageEditPipeline: tints the input instead of running diffusion."""
+
+    device = "cpu"
+
+    def __call__(self, image, prompt=None, num_inference_steps=1, **kwargs):
+        from PIL import ImageOps  # type: ignore
+
+        images = image if isinstance(image, list) else [image]
+        edited = [ImageOps.colorize(ImageOps.grayscale(img), black="#202020", white="#d8f0a0") for img in images]
+        return SimpleNamespace(images=edited)
+
+
+def _load_qwen():
+    if os.getenv("QWEN_PIPELINE", "").lower() == "fake":
+        return FakeEditPipeline()
+    import torch  # type: ignore
+    from diffusers import QwenImageEditPipeline  # type: ignore
+
+    pipe = QwenImageEditPipeline.from_pretrained(os.getenv("QWEN_MODEL_ID", "Qwen/Qwen-Image-Edit"))
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    try:
+        pipe.to(torch.bfloat16)
+    except Exception:
+        pass
+    pipe.to(device)
+    pipe.set_progress_bar_config(disable=True)
+    return pipe
+
+
+class InferenceProfile(NamedTuple):
+    """Speed/quality trade-off for image edits, picked per request by name."""
+
+    name: str
+    # Longest side of the generated image; None keeps the pipeline's ~1MP default
+    max_side: Optional[int]
+    steps: int
+    # True classifier-free guidance runs the transformer twice per step
+    cfg: bool
+    # diffusers scheduler class built from the loaded scheduler's config; None keeps it
+    scheduler: Optional[str] = None
+    # torch intra-op threads; 0 uses QWEN_NUM_THREADS, or every core the process may run on
+    threads: int = 0
+    channels_last: bool = False
+    compile: bool = False
+
+
+INFERENCE_PROFILES: dict[str, InferenceProfile] = {
+    "quality": InferenceProfile("quality", None, 25, True),
+    "fast": InferenceProfile("fast", 768, 12, False, channels_last=True),
+    "preview": InferenceProfile("preview", 512, 6, False, channels_last=True),
+}
+
+
+class ProfileSettings:
+    """Process-wide profile defaults, set from config in init_app."""
+
+    def __init__(self):
+        # "" picks "quality" on a GPU and "fast" on CPU
+        self.default = ""
+        self.num_threads = 0
+        self.compile = False
+
+    def resolve(self, name: Optional[str], device: str = "cpu") -> InferenceProfile:
+        name = name or self.default or ("quality" if device.startswith("cuda") else "fast")
+        try:
+            profile = INFERENCE_PROFILES[name]
+        except KeyError:
+            raise ValueError(f"Unknown profile {name!r}; choose one of {', '.join(INFERENCE_PROFILES)}") from None
+        return profile._replace(compile=profile.compile or self.compile)
+
+
+profile_settings = ProfileSettings()
+
+
+_PROFILE_FIELD_TYPES: dict[str, tuple] = {
+    "max_side": (int, type(None)),
+    "steps": (int,),
+    "cfg": (bool,),
+    "scheduler": (str, type(None)),
+    "threads": (int,),
+    "channels_last": (bool,),
+    "compile": (bool,),
+}
+
+
+def configure_profiles(overrides) -> None:
+    """Merge {"name": {field: value}} (a dict or its JSON text) into INFERENCE_PROFILES.
+
+    Unknown names add new profiles based on "quality". Everything is checked
+    before anything is applied; a bad entry raises ValueError naming it.
+    """
+    if isinstance(overrides, str):
+        try:
+            overrides = json.loads(overrides) if overrides.strip() else {}
+        except ValueError as e:
+            raise ValueError(f"QWEN_PROFILES is not valid JSON: {e}") from None
+    if not isinstance(overrides, dict):
+        raise ValueError("QWEN_PROFILES must be a JSON object of profile name -> fields")
+    for name, fields in overrides.items():
+        if not isinstance(fields, dict):
+            raise ValueError(f"QWEN_PROFILES[{name!r}] must be an object of fields")
+        for field, value in fields.items():
+            types = _PROFILE_FIELD_TYPES.get(field)
+            if types is None:
+                raise ValueError(f"QWEN_PROFILES[{name!r}]: unknown field {field!r}; "
+                                 f"expected one of {', '.join(_PROFILE_FIELD_TYPES)}")
+            # bool is an int, but "steps": true is a typo, not a step count
+            if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+                raise ValueError(f"QWEN_PROFILES[{name!r}][{field!r}] has an invalid value {value!r}")
+        if fields.get("steps", 1) < 1:
+            raise ValueError(f"QWEN_PROFILES[{name!r}]['steps'] must be at least 1")
+    for name, fields in overrides.items():
+        base = INFERENCE_PROFILES.get(name, INFERENCE_PROFILES["quality"])
+        INFERENCE_PROFILES[name] = base._replace(name=name, **fields)
+
+
+def _cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _prepare(pipe, profile: InferenceProfile) -> None:
+    """Apply the profile's process and pipeline settings before a call.
+
+    Thread count and scheduler follow every profile switch; channels-last and
+    torch.compile are one-way and stay on once a profile has enabled them.
+    """
+    try:
+        import torch  # type: ignore
+    except ImportError:
+        return
+    threads = profile.threads or profile_settings.num_threads or _cpu_count()
+    if torch.get_num_threads() != threads:
+        torch.set_num_threads(threads)
+
+    scheduler = getattr(pipe, "scheduler", None)
+    if scheduler is not None:
+        default = pipe.__dict__.setdefault("_default_scheduler", scheduler)
+        if profile.scheduler and type(scheduler).__name__ != profile.scheduler:
+            import diffusers  # type: ignore
+
+            pipe.scheduler = getattr(diffusers, profile.scheduler).from_config(default.config)
+        elif not profile.scheduler and scheduler is not default:
+            pipe.scheduler = default
+
+    if profile.channels_last and not getattr(pipe, "_channels_last", False):
+        vae = getattr(pipe, "vae", None)
+        if vae is not None:
+            # The Qwen-Image VAE is built from 3D convolutions
+            try:
+                vae.to(memory_format=torch.channels_last)
+            except RuntimeError:
+                vae.to(memory_format=torch.channels_last_3d)
+        pipe._channels_last = True
+    if profile.compile and not getattr(pipe, "_compiled", False):
+        transformer = getattr(pipe, "transformer", None)
+        if transformer is not None:
+            pipe.transformer = torch.compile(transformer)
+        pipe._compiled = True
+
+
+def working_size(size: tuple[int, int], max_side: Optional[int]) -> Optional[tuple[int, int]]:
+    """(width, height) to generate at: `size` scaled to fit `max_side`, in multiples of 16."""
+    if not max_side:
+        return None
+    width, height = size
+    scale = min(1.0, max_side / max(width, height))
+    return max(16, int(width * scale) // 16 * 16), max(16, int(height * scale) // 16 * 16)
+
+
+def _edit_inputs(profile: InferenceProfile, size: Optional[tuple[int, int]], steps: Optional[int]) -> dict:
+    inputs: dict = {"num_inference_steps": steps or profile.steps}
+    if size:
+        inputs["width"], inputs["height"] = size
+    if profile.cfg:
+        inputs["true_cfg_scale"] = 4.0
+    else:
+        # Without a negative prompt the pipeline skips the unconditional pass
+        inputs["true_cfg_scale"] = 1.0
+    return inputs
+
+
+def _invoke(pipe, inputs: dict, should_stop: Optional[Callable[[], bool]]) -> list:
+    if should_stop is not None:
+        # diffusers checks `_interrupt` before every denoising step
+        def _on_step_end(p, step, timestep, callback_kwargs):
+            if should_stop():
+                p._interrupt = True
+            return callback_kwargs
+
+        inputs["callback_on_step_end"] = _on_step_end
+    try:
+        import torch  # type: ignore
+    except ImportError:
+        return list(pipe(**inputs).images)
+    inputs["generator"] = torch.manual_seed(0)
+    with torch.inference_mode():
+        return list(pipe(**inputs).images)
+
+
+def run_edit(pipe, image, prompt: str, num_inference_steps: Optional[int] = None,
+             should_stop: Optional[Callable[[], bool]] = None, profile: Optional[str] = None):
+    from PIL import Image  # type: ignore
+
+    profile_ = profile_settings.resolve(profile, str(getattr(pipe, "device", "cpu")))
+    _prepare(pipe, profile_)
+    size = working_size(image.size, profile_.max_side)
+    if size and size != image.size:
+        image = image.resize(size, Image.Resampling.BILINEAR)
+    inputs = {"image": image, "prompt": prompt, **_edit_inputs(profile_, size, num_inference_steps)}
+    if profile_.cfg:
+        inputs["negative_prompt"] = " "
+    return _invoke(pipe, inputs, should_stop)[0]
+
+
+def run_edit_batch(pipe, images: list, prompt: str, num_inference_steps: Optional[int] = None,
+                   should_stop: Optional[Callable[[], bool]] = None, profile: Optional[str] = None) -> list:
+    """Edit several images with as few pipeline calls as possible.
+
+    One batched call needs one output size, so images are grouped by working
+    size and each group runs as one denoising loop. Pipelines that reject list
+    inputs, or return the wrong number of images, fall back to one call per image.
+    """
+    from PIL import Image  # type: ignore
+
+    profile_ = profile_settings.resolve(profile, str(getattr(pipe, "device", "cpu")))
+    groups: dict[tuple[int, int], list[int]] = {}
+    for i, image in enumerate(images):
+        groups.setdefault(working_size(image.size, profile_.max_side) or image.size, []).append(i)
+
+    edited: list = [None] * len(images)
+    for size, indices in groups.items():
+        if len(indices) == 1:
+            edited[indices[0]] = run_edit(pipe, images[indices[0]], prompt, num_inference_steps, should_stop, profile)
+            continue
+        _prepare(pipe, profile_)
+        group = [images[i] if images[i].size == size else images[i].resize(size, Image.Resampling.BILINEAR)
+                 for i in indices]
+        inputs = {"image": group, "prompt": [prompt] * len(group),
+                  **_edit_inputs(profile_, size if profile_.max_side else None, num_inference_steps)}
+        if profile_.cfg:
+            inputs["negative_prompt"] = [" "] * len(group)
+        try:
+            out = _invoke(pipe, inputs, should_stop)
+        except (TypeError, ValueError):
+            out = []
+        if len(out) != len(group):
+            out = [run_edit(pipe, images[i], prompt, num_inference_steps, should_stop, profile) for i in indices]
+        for i, img in zip(indices, out):
+            edited[i] = img
+    return edited
+
+
+def _warm_qwen(pipe) -> None:
+    from PIL import Image  # type: ignore
+
+    run_edit(pipe, Image.new("RGB", (64, 64), (40, 120, 40)), "warmup", num_inference_steps=1)
+
+
+qwen_registry = PipelineRegistry("qwen-image-edit", _load_qwen, warmup=_warm_qwen)
+
+
+def qwen_available() -> bool:
+    if qwen_registry.loaded or os.getenv("QWEN_PIPELINE", "").lower() == "fake":
+        return True
+    # Do not queue edits that would only fail until the next load attempt
+    if qwen_registry.retry_in is not None:
+        return False
+    return all(importlib.util.find_spec(mod) is not None for mod in ("torch", "diffusers", "PIL"))
+
+
+def init_app(app: Flask) -> None:
+    timeout = app.config.get("QWEN_ACQUIRE_TIMEOUT")
+    qwen_registry.acquire_timeout = float(timeout) if timeout else None
+    qwen_registry.retry_after = float(app.config.get("QWEN_LOAD_RETRY_SECONDS", 300))
+    configure_profiles(app.config.get("QWEN_PROFILES") or {})
+    default = app.config.get("QWEN_PROFILE") or ""
+    if default and default not in INFERENCE_PROFILES:
+        raise ValueError(f"QWEN_PROFILE={default!r} is not a known profile; "
+                         f"choose one of {', '.join(INFERENCE_PROFILES)} or leave it empty")
+    profile_settings.default = default
+    profile_settings.num_threads = int(app.config.get("QWEN_NUM_THREADS") or 0)
+    profile_settings.compile = bool(app.config.get("QWEN_COMPILE"))
+    if app.config.get("QWEN_PRELOAD") and qwen_available():
+        qwen_registry.preload(background=True)
@@ -0,0 +1,227 @@
+import cProfile
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Optional
+
+from flask import Flask, Response, current_app, g, request
+
+from .sql_timing import add_observer
+
+TOKEN_HEADER = "X-Profile-Token"
+QUERY_FLAG = "_profile"
+MAX_STATEMENT_CHARS = 2000
+_APP_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def sign_token(secret: str, ttl: float = 300) -> str:
+    """Token for the X-Profile-Token header: `<expiry>.<hmac>`, valid for `ttl` seconds."""
+    expires = str(int(time.time() + ttl))
+    sig = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{sig}"
+
+
+def verify_token(secret: str, token: str) -> bool:
+    expires, _, sig = token.partition(".")
+    if not secret or not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, sig)
+
+
+class StackSampler:
+    """Samples one thread's Python stack every `interval` seconds from a helper thread.
+
+    Stacks are kept as collapsed lines (`outer;inner;leaf count`), the input
+    format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        path = frame.f_code.co_filename
+        if path.startswith(_APP_ROOT):
+            path = os.path.relpath(path, _APP_ROOT)
+        else:
+            path = os.path.basename(path)
+        return f"{frame.f_code.co_name} ({path})"
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(self._frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfile:
+    def __init__(self, mode: str, reason: str, interval: float):
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.mode = mode
+        self.reason = reason
+        self.started = time.perf_counter()
+        self.statements: list[dict] = []
+        self._sampler: Optional[StackSampler] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+        if mode == "cprofile":
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        else:
+            self._sampler = StackSampler(threading.get_ident(), interval)
+            self._sampler.start()
+
+    def stop(self) -> None:
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        self.elapsed = time.perf_counter() - self.started
+
+    def write(self, directory: str, endpoint: str, method: str, path: str, status: int) -> list[str]:
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{self.id}-{endpoint}")
+        written = []
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(base + ".prof")
+            written.append(base + ".prof")
+        else:
+            with open(base + ".folded", "w") as fh:
+                fh.write(self._sampler.collapsed())
+            written.append(base + ".folded")
+        with open(base + ".sql.json", "w") as fh:
+            json.dump({
+                "id": self.id,
+                "reason": self.reason,
+                "method": method,
+                "path": path,
+                "endpoint": endpoint,
+                "status": status,
+                "elapsed_ms": round(self.elapsed * 1000, 3),
+                "sql_count": len(self.statements),
+                "sql_ms": round(sum(s["ms"] for s in self.statements), 3),
+                "statements": self.statements,
+            }, fh, indent=2)
+        written.append(base + ".sql.json")
+        return written
+
+
+def prune(directory: str, max_bytes: int, keep: frozenset = frozenset()) -> None:
+    """Delete the oldest profile files (except `keep`) until the directory fits in `max_bytes`."""
+    try:
+        entries = [e for e in os.scandir(directory) if e.is_file()]
+    except FileNotFoundError:
+        return
+    stats = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in entries]
+    total = sum(size for _, size, _ in stats)
+    for _, size, path in sorted(stats):
+        if total <= max_bytes:
+            break
+        if path in keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except FileNotFoundError:
+            pass
+
+
+def _is_admin_request() -> bool:
+    from flask_jwt_extended import get_jwt, verify_jwt_in_request
+    from .models import UserRole
+
+    try:
+        verify_jwt_in_request(optional=True)
+    except Exception:
+        return False
+    return (get_jwt() or {}).get("role") == UserRole.ADMIN.value
+
+
+def _profile_reason() -> Optional[str]:
+    config = current_app.config
+    token = request.headers.get(TOKEN_HEADER)
+    if token and verify_token(config.get("PROFILE_SECRET", ""), token):
+        return "token"
+    if request.args.get(QUERY_FLAG) and _is_admin_request():
+        return "admin"
+    rate = int(config.get("PROFILE_SAMPLE_RATE", 0) or 0)
+    if rate > 0 and random.randrange(rate) == 0:
+        return "sampled"
+    return None
+
+
+def _before_request() -> None:
+    reason = _profile_reason()
+    if reason is None:
+        return
+    mode = "cprofile" if request.args.get(QUERY_FLAG) == "cprofile" else "sample"
+    interval = float(current_app.config.get("PROFILE_INTERVAL_MS", 5)) / 1000
+    g._profile = RequestProfile(mode, reason, interval)
+
+
+def _after_request(response: Response) -> Response:
+    profile: Optional[RequestProfile] = g.pop("_profile", None)
+    if profile is None:
+        return response
+    profile.stop()
+    config = current_app.config
+    directory = config.get("PROFILE_DIR") or os.path.join(current_app.instance_path, "profiles")
+    try:
+        written = profile.write(directory, request.endpoint or "unmatched", request.method, request.full_path,
+                                response.status_code)
+        prune(directory, int(config.get("PROFILE_MAX_BYTES", 50 * 1024 * 1024)), frozenset(written))
+    except OSError:
+        current_app.logger.exception("could not write request profile")
+        return response
+    if profile.reason != "sampled":
+        response.headers["X-Profile-Id"] = profile.id
+    return response
+
+
+def _teardown_request(exc) -> None:
+    # Errors that skip after_request must still stop the sampler thread
+    profile = g.pop("_profile", None)
+    if profile is not None:
+        profile.stop()
+
+
+def _observe_query(statement: str, elapsed: float, executemany: bool) -> None:
+    profile = g.get("_profile")
+    if profile is not None:
+        profile.statements.append({
+            "sql": statement[:MAX_STATEMENT_CHARS],
+            "ms": round(elapsed * 1000, 3),
+            "executemany": executemany,
+        })
+
+
+def init_app(app: Flask) -> None:
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    add_observer(_observe_query)
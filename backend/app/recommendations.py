@@ -0,0 +1,35 @@
+from typing import Optional
+
+DEFAULT_CROPS = ["Wheat", "Maize"]
+DEFAULT_MANURE = "Compost"
+DEFAULT_BASIS = "default heuristic"
+
+
+def temperature_band(temp: float) -> tuple[list[str], str]:
+    """Crops and manure for a temperature in C: cool below 18, hot above 28, temperate between."""
+    if temp < 18:
+        return ["Potato", "Barley"], "Well-rotted manure"
+    if temp > 28:
+        return ["Millet", "Sorghum"], "Nitrogen-rich"
+    return list(DEFAULT_CROPS), DEFAULT_MANURE
+
+
+def recommend_for_weather(weather: Optional[dict]) -> dict:
+    """Crop and manure suggestion from an OpenWeather "current weather" payload, or the default without one."""
+    recommendation = {
+        "recommendedCrops": list(DEFAULT_CROPS),
+        "suggestedManure": DEFAULT_MANURE,
+        "basis": DEFAULT_BASIS,
+    }
+    if not weather:
+        return recommendation
+    temp = weather.get("main", {}).get("temp")
+    humidity = weather.get("main", {}).get("humidity")
+    basis = []
+    if temp is not None:
+        basis.append(f"temp {temp}C")
+        recommendation["recommendedCrops"], recommendation["suggestedManure"] = temperature_band(temp)
+    if humidity is not None:
+        basis.append(f"humidity {humidity}%")
+    recommendation["basis"] = ", ".join(basis) or DEFAULT_BASIS
+    return recommendation
@@ -0,0 +1,237 @@
+import functools
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Optional, Protocol
+
+from flask import Flask, Response, current_app, make_response, request
+
+# Namespaces: a cached route declares which data it is built from, mutations bump them
+INVENTORY = "inventory"
+CROPS = "crops"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    namespace TEXT PRIMARY KEY,
+    token TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_responses_created ON responses (created_at);
+"""
+
+
+def _new_token() -> str:
+    # Opaque and never reused, so ETags issued before a cache reset cannot match again
+    return uuid.uuid4().hex[:12]
+
+
+class CacheBackend(Protocol):
+    def version(self, namespace: str) -> str: ...
+
+    def bump(self, namespace: str) -> None: ...
+
+    def get(self, key: str, max_age: float) -> Optional[bytes]: ...
+
+    def put(self, key: str, body: bytes) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class MemoryBackend:
+    """Per-process LRU. Only correct with a single worker: other workers never see its bumps."""
+
+    def __init__(self, max_entries: int = 2000):
+        self.max_entries = max(1, max_entries)
+        self._versions: dict[str, str] = {}
+        self._entries: "OrderedDict[str, tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def version(self, namespace: str) -> str:
+        with self._lock:
+            return self._versions.setdefault(namespace, _new_token())
+
+    def bump(self, namespace: str) -> None:
+        with self._lock:
+            self._versions[namespace] = _new_token()
+
+    def get(self, key: str, max_age: float) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time() - max_age:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._versions.clear()
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """Versions and bodies in a SQLite file shared by every gunicorn worker."""
+
+    def __init__(self, path: str, max_entries: int = 2000):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self._puts = 0
+        self._schema_ready = False
+
+    @contextmanager
+    def _connect(self):
+        if not self._schema_ready:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            if not self._schema_ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                self._schema_ready = True
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def version(self, namespace: str) -> str:
+        with self._connect() as conn:
+            row = conn.execute("SELECT token FROM versions WHERE namespace = ?", (namespace,)).fetchone()
+            if row is not None:
+                return row[0]
+            conn.execute("INSERT OR IGNORE INTO versions (namespace, token) VALUES (?, ?)", (namespace, _new_token()))
+            return conn.execute("SELECT token FROM versions WHERE namespace = ?", (namespace,)).fetchone()[0]
+
+    def bump(self, namespace: str) -> None:
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO versions (namespace, token) VALUES (?, ?)", (namespace, _new_token()))
+
+    def get(self, key: str, max_age: float) -> Optional[bytes]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT body FROM responses WHERE key = ? AND created_at > ?", (key, time.time() - max_age)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, body: bytes) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, created_at) VALUES (?, ?, ?)", (key, body, time.time())
+            )
+            self._puts += 1
+            # Entries under old versions are never read again; trim oldest-first now and then
+            if self._puts % 32 == 1:
+                excess = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    conn.execute(
+                        "DELETE FROM responses WHERE key IN "
+                        "(SELECT key FROM responses ORDER BY created_at ASC LIMIT ?)",
+                        (excess,),
+                    )
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+            conn.execute("DELETE FROM versions")
+
+
+class ResponseCache:
+    """Caches whole JSON responses of public GET routes, keyed by route, query args and data versions.
+
+    Each cached route names the namespaces it reads; `invalidate()` gives a
+    namespace a new version token, so every key and ETag built on the old one
+    stops matching. A request whose If-None-Match equals the current ETag gets a
+    304 without touching the database.
+    """
+
+    def __init__(self):
+        self.backend: Optional[CacheBackend] = None
+        self.ttl = 300.0
+
+    def configure(self, backend: Optional[CacheBackend], ttl: float = 300.0) -> None:
+        self.backend = backend
+        self.ttl = ttl
+
+    def invalidate(self, *namespaces: str) -> None:
+        if self.backend is None:
+            return
+        for namespace in namespaces:
+            try:
+                self.backend.bump(namespace)
+            except sqlite3.Error:
+                # A missed bump would serve stale data until the TTL; make it visible
+                current_app.logger.exception("response cache invalidation failed for %s", namespace)
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+
+    def _key(self, namespaces: tuple[str, ...]) -> str:
+        versions = ",".join(f"{ns}={self.backend.version(ns)}" for ns in namespaces)
+        args = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+        return hashlib.sha256(f"{request.endpoint}?{args}|{versions}".encode()).hexdigest()[:32]
+
+    def cached(self, *namespaces: str) -> Callable:
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.backend is None:
+                    return view(*args, **kwargs)
+                try:
+                    key = self._key(namespaces)
+                    if request.if_none_match.contains(key):
+                        return self._finish(Response(status=304), key, "REVALIDATED")
+                    body = self.backend.get(key, self.ttl)
+                except sqlite3.Error:
+                    return view(*args, **kwargs)
+                if body is not None:
+                    return self._finish(Response(body, mimetype="application/json"), key, "HIT")
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                try:
+                    self.backend.put(key, response.get_data())
+                except sqlite3.Error:
+                    pass
+                return self._finish(response, key, "MISS")
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def _finish(response: Response, key: str, outcome: str) -> Response:
+        response.set_etag(key)
+        # Clients may keep the body but must revalidate; the 304 path is cheap
+        response.headers["Cache-Control"] = "public, no-cache"
+        response.headers["X-Cache"] = outcome
+        return response
+
+
+response_cache = ResponseCache()
+
+
+def init_app(app: Flask) -> None:
+    kind = (app.config.get("RESPONSE_CACHE_BACKEND") or "sqlite").lower()
+    max_entries = int(app.config.get("RESPONSE_CACHE_MAX_ENTRIES", 2000))
+    backend: Optional[CacheBackend]
+    if kind == "memory":
+        backend = MemoryBackend(max_entries)
+    elif kind == "sqlite":
+        path = app.config.get("RESPONSE_CACHE_PATH") or os.path.join(app.instance_path, "response_cache.db")
+        backend = SQLiteBackend(path, max_entries)
+    else:
+        backend = None
+    response_cache.configure(backend, ttl=float(app.config.get("RESPONSE_CACHE_TTL", 300)))
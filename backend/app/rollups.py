@@ -0,0 +1,145 @@
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import Date, cast, delete, func, insert, literal, select, update
+
+from .extensions import db
+from .models import (
+    CropSales,
+    FarmerSales,
+    Inventory,
+    Order,
+    OrderItem,
+    SalesDaily,
+    StatTotal,
+    User,
+    UserRole,
+    UserRoleCount,
+)
+
+TOTAL_SALES = "total_sales"
+ITEMS_SOLD = "items_sold"
+
+
+def _dialect() -> str:
+    return db.session.get_bind().dialect.name
+
+
+def _increment(model, key_columns: tuple[str, ...], rows: list[dict]) -> None:
+    """Upsert `rows`, adding every non-key value onto the existing row."""
+    if not rows:
+        return
+    table = model.__table__
+    amounts = [name for name in rows[0] if name not in key_columns]
+    dialect = _dialect()
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={name: table.c[name] + stmt.excluded[name] for name in amounts},
+        )
+        db.session.execute(stmt)
+    elif dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        stmt = dialect_insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update({name: table.c[name] + stmt.inserted[name] for name in amounts})
+        db.session.execute(stmt)
+    else:
+        for row in rows:
+            result = db.session.execute(
+                update(table)
+                .where(*[table.c[key] == row[key] for key in key_columns])
+                .values({name: table.c[name] + row[name] for name in amounts})
+            )
+            if result.rowcount == 0:
+                db.session.execute(insert(table).values(row))
+
+
+def record_order(order: Order, lines: Iterable[tuple[Inventory, int, float]]) -> None:
+    """Fold a new order into the rollups; call before the order's commit."""
+    crops: dict[str, int] = {}
+    farmers: dict[int, float] = {}
+    items_sold = 0
+    for listing, qty, price in lines:
+        items_sold += qty
+        crops[listing.crop_name] = crops.get(listing.crop_name, 0) + qty
+        farmers[listing.farmer_id] = farmers.get(listing.farmer_id, 0.0) + qty * price
+
+    day = (order.created_at or datetime.utcnow()).date()
+    _increment(SalesDaily, ("day",), [
+        {"day": day, "total_amount": order.total_amount, "orders": 1, "items_sold": items_sold}
+    ])
+    _increment(CropSales, ("crop_name",), [
+        {"crop_name": name, "quantity": qty} for name, qty in sorted(crops.items())
+    ])
+    _increment(FarmerSales, ("farmer_id",), [
+        {"farmer_id": farmer_id, "revenue": revenue, "orders": 1} for farmer_id, revenue in sorted(farmers.items())
+    ])
+    _increment(StatTotal, ("name",), [
+        {"name": ITEMS_SOLD, "value": items_sold},
+        {"name": TOTAL_SALES, "value": order.total_amount},
+    ])
+
+
+def record_user(role: UserRole) -> None:
+    _increment(UserRoleCount, ("role",), [{"role": role, "count": 1}])
+
+
+def _day_expr():
+    # CAST(... AS DATE) has numeric affinity on SQLite and would keep only the year
+    if _dialect() in ("sqlite", "mysql"):
+        return func.date(Order.created_at)
+    return cast(Order.created_at, Date)
+
+
+def rebuild() -> None:
+    """Recompute every rollup from the base tables inside the current transaction."""
+    for model in (SalesDaily, CropSales, FarmerSales, UserRoleCount, StatTotal):
+        db.session.execute(delete(model))
+
+    day = _day_expr()
+    items_per_order = (
+        select(OrderItem.order_id, func.sum(OrderItem.quantity).label("qty"))
+        .group_by(OrderItem.order_id)
+        .subquery()
+    )
+    db.session.execute(insert(SalesDaily).from_select(
+        ["day", "total_amount", "orders", "items_sold"],
+        select(
+            day,
+            func.sum(Order.total_amount),
+            func.count(Order.id),
+            func.coalesce(func.sum(items_per_order.c.qty), 0),
+        )
+        .outerjoin(items_per_order, items_per_order.c.order_id == Order.id)
+        .group_by(day),
+    ))
+    db.session.execute(insert(CropSales).from_select(
+        ["crop_name", "quantity"],
+        select(Inventory.crop_name, func.sum(OrderItem.quantity))
+        .join(OrderItem, OrderItem.inventory_id == Inventory.id)
+        .group_by(Inventory.crop_name),
+    ))
+    db.session.execute(insert(FarmerSales).from_select(
+        ["farmer_id", "revenue", "orders"],
+        select(
+            Inventory.farmer_id,
+            func.sum(OrderItem.quantity * OrderItem.price),
+            func.count(func.distinct(OrderItem.order_id)),
+        )
+        .join(OrderItem, OrderItem.inventory_id == Inventory.id)
+        .group_by(Inventory.farmer_id),
+    ))
+    db.session.execute(insert(UserRoleCount).from_select(
+        ["role", "count"],
+        select(User.role, func.count(User.id)).group_by(User.role),
+    ))
+    db.session.execute(insert(StatTotal).from_select(
+        ["name", "value"],
+        select(literal(TOTAL_SALES), func.coalesce(func.sum(Order.total_amount), 0.0))
+        .union_all(select(literal(ITEMS_SOLD), func.coalesce(func.sum(OrderItem.quantity), 0))),
+    ))
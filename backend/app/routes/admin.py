@@ -1,9 +1,10 @@
 from flask import Blueprint
 from flask_jwt_extended import jwt_required, get_jwt
-from sqlalchemy import func, extract
+from sqlalchemy import func
 from datetime import datetime, timedelta
 from ..extensions import db
-from ..models import UserRole, User, Order, OrderItem, Inventory
+from ..models import UserRole, User, Inventory, SalesDaily, CropSales, FarmerSales, UserRoleCount, StatTotal
+from ..rollups import TOTAL_SALES, ITEMS_SOLD
 
 
 admin_bp = Blueprint("admin", __name__)
@@ -22,39 +23,37 @@ def stats():
     forbidden = _require_admin(claims)
     if forbidden:
         return forbidden
-    num_farmers = db.session.query(func.count(User.id)).filter_by(role=UserRole.FARMER).scalar() or 0
-    num_customers = db.session.query(func.count(User.id)).filter_by(role=UserRole.CUSTOMER).scalar() or 0
-    total_sales = db.session.query(func.coalesce(func.sum(Order.total_amount), 0.0)).scalar() or 0.0
-    items_sold = db.session.query(func.coalesce(func.sum(OrderItem.quantity), 0)).scalar() or 0
+    # Everything except activeListings comes from the rollup tables, so the
+    # cost of this view does not grow with order history.
+    role_counts = dict(db.session.query(UserRoleCount.role, UserRoleCount.count).all())
+    num_farmers = role_counts.get(UserRole.FARMER, 0)
+    num_customers = role_counts.get(UserRole.CUSTOMER, 0)
+    totals = dict(db.session.query(StatTotal.name, StatTotal.value).all())
+    total_sales = totals.get(TOTAL_SALES, 0.0)
+    items_sold = totals.get(ITEMS_SOLD, 0)
     active_listings = db.session.query(func.count(Inventory.id)).filter_by(available=True).scalar() or 0
 
     # Monthly sales for last 6 months
     now = datetime.utcnow().replace(day=1)
     six_months_ago = (now - timedelta(days=31 * 5)).replace(day=1)
-    sales_rows = (
-        db.session.query(
-            extract('year', Order.created_at).label('y'),
-            extract('month', Order.created_at).label('m'),
-            func.coalesce(func.sum(Order.total_amount), 0.0).label('total')
-        )
-        .filter(Order.created_at >= six_months_ago)
-        .group_by('y', 'm')
-        .order_by('y', 'm')
+    day_rows = (
+        db.session.query(SalesDaily.day, SalesDaily.total_amount)
+        .filter(SalesDaily.day >= six_months_ago.date())
+        .order_by(SalesDaily.day)
         .all()
     )
+    months: dict[tuple[int, int], float] = {}
+    for day, amount in day_rows:
+        months[(day.year, day.month)] = months.get((day.year, day.month), 0.0) + amount
     monthly_sales = []
-    for row in sales_rows:
-        month_num = int(row.m)
-        year_num = int(row.y)
+    for (year_num, month_num), total in months.items():
         month_name = datetime(year_num, month_num, 1).strftime('%b')
-        monthly_sales.append({"month": month_name, "year": year_num, "sales": float(row.total)})
+        monthly_sales.append({"month": month_name, "year": year_num, "sales": float(total)})
 
     # Top crops in demand by quantity sold
     crop_rows = (
-        db.session.query(Inventory.crop_name, func.coalesce(func.sum(OrderItem.quantity), 0).label('qty'))
-        .join(OrderItem, OrderItem.inventory_id == Inventory.id)
-        .group_by(Inventory.crop_name)
-        .order_by(func.coalesce(func.sum(OrderItem.quantity), 0).desc())
+        db.session.query(CropSales.crop_name, CropSales.quantity)
+        .order_by(CropSales.quantity.desc())
         .limit(6)
         .all()
     )
@@ -62,16 +61,10 @@ def stats():
 
     # Top farmers by sales
     farmer_rows = (
-        db.session.query(
-            User.name.label('name'),
-            func.coalesce(func.sum(OrderItem.quantity * OrderItem.price), 0.0).label('sales'),
-            func.count(func.distinct(OrderItem.order_id)).label('orders')
-        )
-        .join(Inventory, Inventory.farmer_id == User.id)
-        .join(OrderItem, OrderItem.inventory_id == Inventory.id)
+        db.session.query(User.name.label('name'), FarmerSales.revenue.label('sales'), FarmerSales.orders.label('orders'))
+        .join(User, User.id == FarmerSales.farmer_id)
         .filter(User.role == UserRole.FARMER)
-        .group_by(User.id, User.name)
-        .order_by(func.coalesce(func.sum(OrderItem.quantity * OrderItem.price), 0.0).desc())
+        .order_by(FarmerSales.revenue.desc())
         .limit(5)
         .all()
     )
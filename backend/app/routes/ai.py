@@ -1,55 +1,106 @@
+import importlib.util
+import json
+import math
 import os
-from uuid import uuid4
-from flask import Blueprint, request, current_app
+from flask import Blueprint, Response, request, current_app, stream_with_context
 from typing import Optional
 
-try:
-    import torch  # type: ignore
-    from PIL import Image  # type: ignore
-    from diffusers import QwenImageEditPipeline  # type: ignore
-    _QWEN_AVAILABLE = True
-except Exception:
-    _QWEN_AVAILABLE = False
-import requests
+# The AI stack (Pillow, NumPy, torch, diffusers, google-generativeai) is imported
+# on first use, so workers that only serve the shop API never pay for it.
+_LEAF_CHECK_AVAILABLE = all(importlib.util.find_spec(mod) is not None for mod in ("PIL", "numpy"))
+from ..answer_cache import answer_cache
+from ..jobs import JobCancelled, JobQueueFull, job_queue
+from ..llm import LLMError, LLMNotConfigured, get_llm_backend
+from ..metrics import track_ai
+from ..pipelines import INFERENCE_PROFILES, profile_settings, qwen_registry, qwen_available, run_edit, run_edit_batch
+from ..recommendations import recommend_for_weather
+from ..storage import save_image, save_upload
+from ..weather import WeatherUnavailable, weather_client
 
 ai_bp = Blueprint("ai", __name__)
 
+DEFAULT_EDIT_PROMPT = "Enhance and highlight diseased leaf regions with subtle outlines"
+
 
 @ai_bp.get("/recommend-crop")
 def recommend_crop():
     city = request.args.get("city", "")
-    api_key = os.getenv("OPENWEATHER_API_KEY", "")
-    recommendation = {
-        "recommendedCrops": ["Wheat", "Maize"],
-        "suggestedManure": "Compost",
-        "basis": "default heuristic",
-    }
-    if city and api_key:
+    weather = None
+    if city and weather_client.configured:
         try:
-            r = requests.get(
-                "https://api.openweathermap.org/data/2.5/weather",
-                params={"q": city, "appid": api_key, "units": "metric"},
-                timeout=6,
-            )
-            if r.ok:
-                w = r.json()
-                temp = w.get("main", {}).get("temp")
-                humidity = w.get("main", {}).get("humidity")
-                basis = []
-                if temp is not None:
-                    basis.append(f"temp {temp}C")
-                if humidity is not None:
-                    basis.append(f"humidity {humidity}%")
-                if temp is not None and temp < 18:
-                    recommendation["recommendedCrops"] = ["Potato", "Barley"]
-                    recommendation["suggestedManure"] = "Well-rotted manure"
-                elif temp is not None and temp > 28:
-                    recommendation["recommendedCrops"] = ["Millet", "Sorghum"]
-                    recommendation["suggestedManure"] = "Nitrogen-rich"
-                recommendation["basis"] = ", ".join(basis) or recommendation["basis"]
+            # Cached per city and shared by concurrent requests; see app/weather.py
+            weather = weather_client.current(city=city)
         except Exception:
             pass
-    return recommendation
+    return recommend_for_weather(weather)
+
+
+def _batch_location(entry) -> tuple:
+    """A batch entry ("Pune", {"city": ...} or {"lat": .., "lon": ..}) as a weather cache key."""
+    if isinstance(entry, str):
+        return weather_client.location_key(city=entry.strip())
+    if isinstance(entry, dict):
+        if entry.get("city"):
+            return weather_client.location_key(city=str(entry["city"]).strip())
+        lat, lon = float(entry["lat"]), float(entry["lon"])
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError("lat/lon out of range")
+        return weather_client.location_key(lat=lat, lon=lon)
+    raise ValueError("expected a city name or {lat, lon}")
+
+
+@ai_bp.post("/recommend-crop/batch")
+def recommend_crop_batch():
+    data = request.get_json(silent=True) or {}
+    locations = data.get("locations", data.get("cities"))
+    if not isinstance(locations, list) or not locations:
+        return {"error": "Provide a non-empty 'locations' list"}, 400
+    max_items = int(current_app.config.get("RECOMMEND_BATCH_MAX", 50))
+    if len(locations) > max_items:
+        return {"error": f"At most {max_items} locations per batch"}, 400
+    max_deadline = float(current_app.config.get("RECOMMEND_BATCH_DEADLINE", 6))
+    try:
+        timeout_ms = float(data.get("timeoutMs", max_deadline * 1000))
+    except (TypeError, ValueError):
+        return {"error": "Invalid timeoutMs"}, 400
+    if not math.isfinite(timeout_ms) or timeout_ms <= 0:
+        return {"error": "timeoutMs must be a positive number"}, 400
+    # Below ~50ms not even a cached lookup reliably finishes
+    deadline = min(max(timeout_ms / 1000, 0.05), max_deadline)
+
+    keys: list = []
+    for entry in locations:
+        try:
+            keys.append(_batch_location(entry))
+        except (KeyError, TypeError, ValueError) as e:
+            keys.append(ValueError(str(e) or "invalid location"))
+
+    valid = [k for k in keys if not isinstance(k, Exception)]
+    # Repeated cities/coordinates share one lookup; all of them run concurrently
+    if not weather_client.configured:
+        unconfigured = WeatherUnavailable("Weather service is not configured on the server")
+        weather = {key: unconfigured for key in valid}
+    else:
+        weather = weather_client.current_many(valid, deadline) if valid else {}
+
+    results = []
+    failed = 0
+    for entry, key in zip(locations, keys):
+        if isinstance(key, Exception):
+            failed += 1
+            results.append({"location": entry, "status": "invalid", "error": str(key)})
+            continue
+        outcome = weather.get(key)
+        item = {"location": entry, **recommend_for_weather(outcome if isinstance(outcome, dict) else None)}
+        if isinstance(outcome, WeatherUnavailable):
+            # Partial result: the default heuristic, flagged, instead of failing the whole batch
+            failed += 1
+            item["status"] = "unavailable"
+            item["error"] = str(outcome)
+        else:
+            item["status"] = "ok"
+        results.append(item)
+    return {"results": results, "lookups": len(set(valid)), "failed": failed}
 
 
 @ai_bp.post("/chatbot")
@@ -58,26 +109,113 @@ def chatbot():
     question = (data.get("question") or "").strip()
     if not question:
         return {"error": "No question provided"}, 400
-    gemini_key = os.getenv("GEMINI_API_KEY", "").strip()
-    if not gemini_key:
-        return {"error": "GEMINI_API_KEY not configured on server"}, 400
+    stream = request.args.get("stream", "").lower() in ("1", "true") or data.get("stream") is True
     try:
-        import google.generativeai as genai  # type: ignore
-        genai.configure(api_key=gemini_key)
-        model_name = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
-        model = genai.GenerativeModel(model_name)
-        resp = model.generate_content(question)
-        text = getattr(resp, "text", None)
-        if not text and getattr(resp, "candidates", None):
+        # Built once per worker; LLM_BACKEND=fake swaps in a local stand-in
+        backend = get_llm_backend()
+    except LLMNotConfigured as e:
+        return {"error": str(e)}, 400
+    except Exception as e:
+        return {"error": f"LLM backend error: {str(e)}"}, 502
+
+    # Repeated questions are answered from the shared cache unless the caller opts out
+    use_cache = request.args.get("nocache", "").lower() not in ("1", "true") and data.get("cache", True) is not False
+    cached = answer_cache.get(question, backend.model_name) if use_cache else None
+
+    if stream:
+        def events():
+            # Server-Sent Events: one `data:` frame per text chunk, then `event: done`
+            if cached is not None:
+                yield f"data: {json.dumps({'token': cached})}\n\n"
+                yield f"event: done\ndata: {json.dumps({'cached': True})}\n\n"
+                return
+            pieces = []
             try:
-                text = resp.candidates[0].content.parts[0].text
-            except Exception:
-                text = None
-        if not text:
-            return {"error": "Gemini returned no content"}, 502
-        return {"answer": text}
+                with track_ai(backend.label, "stream"):
+                    for piece in backend.stream(question):
+                        pieces.append(piece)
+                        yield f"data: {json.dumps({'token': piece})}\n\n"
+                if use_cache and pieces:
+                    answer_cache.put(question, backend.model_name, "".join(pieces))
+                yield "event: done\ndata: {}\n\n"
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'error': f'{backend.label} error: {str(e)}'})}\n\n"
+
+        return Response(
+            stream_with_context(events()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    if cached is not None:
+        return {"answer": cached, "cached": True}
+    try:
+        with track_ai(backend.label, "generate"):
+            answer = backend.generate(question)
+        if use_cache:
+            answer_cache.put(question, backend.model_name, answer)
+        return {"answer": answer}
+    except LLMError as e:
+        return {"error": str(e)}, 502
     except Exception as e:
-        return {"error": f"Gemini error: {str(e)}"}, 502
+        return {"error": f"{backend.label} error: {str(e)}"}, 502
+
+
+@ai_bp.get("/status")
+def status():
+    return {
+        "available": qwen_available(),
+        "pipelines": [qwen_registry.status()],
+        "profiles": {name: profile._asdict() for name, profile in INFERENCE_PROFILES.items()},
+        "defaultProfile": profile_settings.default or None,
+        "answerCache": answer_cache.stats(),
+    }
+
+
+@job_queue.handler("disease-edit")
+def _run_disease_edit(payload: dict, ctx) -> dict:
+    from PIL import Image  # type: ignore
+
+    image = Image.open(os.path.join(payload["uploadsDir"], payload["filename"])).convert("RGB")
+    # The pipeline is loaded once per worker and used by one job at a time
+    with qwen_registry.acquire() as pipe, track_ai("qwen", "edit"):
+        out_img = run_edit(pipe, image, payload["prompt"], should_stop=ctx.cancelled, profile=payload.get("profile"))
+    if ctx.cancelled():
+        raise JobCancelled()
+    edited_filename = save_image(out_img, payload["uploadsDir"], os.path.splitext(payload["filename"])[1])
+    return {"editedImage": f"/uploads/{edited_filename}"}
+
+
+@job_queue.handler("disease-edit-batch")
+def _run_disease_edit_batch(payload: dict, ctx) -> dict:
+    from PIL import Image  # type: ignore
+
+    filenames = payload["filenames"]
+    images = [Image.open(os.path.join(payload["uploadsDir"], name)).convert("RGB") for name in filenames]
+    # One acquire and one batched denoising loop for the whole chunk
+    with qwen_registry.acquire() as pipe, track_ai("qwen", "edit_batch"):
+        out_imgs = run_edit_batch(pipe, images, payload["prompt"], should_stop=ctx.cancelled,
+                                  profile=payload.get("profile"))
+    if ctx.cancelled():
+        raise JobCancelled()
+    edited = [save_image(img, payload["uploadsDir"], os.path.splitext(name)[1]) for img, name in zip(out_imgs, filenames)]
+    return {"editedImages": [f"/uploads/{name}" for name in edited]}
+
+
+@ai_bp.get("/jobs/<job_id>")
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if not job:
+        return {"error": "Job not found or expired"}, 404
+    return job
+
+
+@ai_bp.delete("/jobs/<job_id>")
+def cancel_job(job_id: str):
+    job = job_queue.cancel(job_id)
+    if not job:
+        return {"error": "Job not found or expired"}, 404
+    return job
 
 
 @ai_bp.post("/disease-detect")
@@ -87,71 +225,125 @@ def disease_detect():
     file = request.files['image']
     if not file.filename:
         return {"error": "Empty filename"}, 400
+    # Checked before saving, so a rejected request leaves no orphaned upload behind
+    profile = request.form.get("profile") or request.args.get("profile") or None
+    if profile and profile not in INFERENCE_PROFILES:
+        return _unknown_profile(profile)
     uploads_dir = current_app.config['UPLOAD_FOLDER']
-    os.makedirs(uploads_dir, exist_ok=True)
     ext = os.path.splitext(file.filename)[1].lower() or '.jpg'
-    filename = f"{uuid4().hex}{ext}"
+    # Stored by content hash, so re-uploading the same photo reuses one file
+    filename = save_upload(file, uploads_dir, ext)
     path = os.path.join(uploads_dir, filename)
-    file.save(path)
     prompt: Optional[str] = request.form.get("prompt") or request.json.get("prompt") if request.is_json else None
 
     # Basic heuristic to detect presence of green leaf-like pixels
     leaf_detected = True
+    leaf_ratio: Optional[float] = None
+    leaf_box: Optional[list[int]] = None
     try:
-        if _QWEN_AVAILABLE:
-            img_rgb = Image.open(path).convert("RGB")
-            pixels = img_rgb.getdata()
-            total = len(pixels)
-            greenish = 0
-            for r, g, b in pixels[::50]:  # sample every 50th pixel for speed
-                if g > r + 15 and g > b + 15 and g > 60:
-                    greenish += 1
-            ratio = greenish / max(1, total / 50)
-            # If very low greenish ratio, likely not a leafy image
-            if ratio < 0.04:
-                leaf_detected = False
+        if _LEAF_CHECK_AVAILABLE:
+            from ..leaf import detect_leaf
+
+            detection = detect_leaf(path)
+            leaf_detected = detection.detected
+            leaf_ratio = round(detection.ratio, 4)
+            leaf_box = list(detection.bbox) if detection.bbox else None
     except Exception:
         leaf_detected = True
 
     # If no leaf detected, skip heavy processing
     if not leaf_detected:
-        return {
-            "leafDetected": False,
-            "message": "Leaf not detected in the uploaded image",
-            "image": f"/uploads/{filename}",
-        }
-
-    # If Qwen pipeline available, run an illustrative edit to highlight diseased regions based on prompt
-    edited_filename: Optional[str] = None
-    if _QWEN_AVAILABLE:
+        return _no_leaf_result(filename, leaf_ratio)
+
+    # If Qwen pipeline available, queue an illustrative edit to highlight diseased regions
+    # based on prompt; the client polls editJob.url for the edited image.
+    edit_job: Optional[dict] = None
+    if qwen_available():
+        edit_job = _submit_edit("disease-edit", {"uploadsDir": uploads_dir, "filename": filename,
+                                                 "prompt": prompt or DEFAULT_EDIT_PROMPT, "profile": profile})
+    return _analysis_result(filename, prompt, leaf_ratio, leaf_box, edit_job)
+
+
+@ai_bp.post("/disease-detect/batch")
+def disease_detect_batch():
+    files = [f for f in request.files.getlist("images") + request.files.getlist("image") if f.filename]
+    if not files:
+        return {"error": "No images provided"}, 400
+    max_images = int(current_app.config.get("DISEASE_BATCH_MAX", 32))
+    if len(files) > max_images:
+        return {"error": f"At most {max_images} images per batch"}, 400
+    uploads_dir = current_app.config['UPLOAD_FOLDER']
+    prompt: Optional[str] = request.form.get("prompt")
+    profile = request.form.get("profile") or request.args.get("profile") or None
+    if profile and profile not in INFERENCE_PROFILES:
+        return _unknown_profile(profile)
+    filenames = [save_upload(f, uploads_dir, os.path.splitext(f.filename)[1].lower() or '.jpg') for f in files]
+
+    # One vectorized leaf pass over the whole batch; undecodable images are analysed
+    # anyway, like the single-image endpoint does when the check fails
+    detections: list = [None] * len(filenames)
+    if _LEAF_CHECK_AVAILABLE:
+        from ..leaf import detect_leaves
+
         try:
-            image = Image.open(path).convert("RGB")
-            pipe = QwenImageEditPipeline.from_pretrained("Qwen/Qwen-Image-Edit")
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            try:
-                pipe.to(torch.bfloat16)
-            except Exception:
-                pass
-            pipe.to(device)
-            pipe.set_progress_bar_config(disable=True)
-            edit_prompt = prompt or "Enhance and highlight diseased leaf regions with subtle outlines"
-            inputs = {
-                "image": image,
-                "prompt": edit_prompt,
-                "generator": torch.manual_seed(0),
-                "true_cfg_scale": 4.0,
-                "negative_prompt": " ",
-                "num_inference_steps": 25,
-            }
-            with torch.inference_mode():
-                output = pipe(**inputs)
-                out_img = output.images[0]
-                edited_filename = f"edited_{filename}"
-                out_path = os.path.join(uploads_dir, edited_filename)
-                out_img.save(out_path)
+            detections = detect_leaves([os.path.join(uploads_dir, name) for name in filenames])
         except Exception:
-            edited_filename = None
+            pass
+    leafy = [i for i, d in enumerate(detections) if d is None or d.detected]
+    # A file that failed to decode would fail the whole edit job it lands in
+    editable = [i for i in leafy if detections[i] is not None or not _LEAF_CHECK_AVAILABLE]
+
+    # Leafy images are edited in chunks of QWEN_BATCH_SIZE, one queued job per chunk;
+    # editJob.index points into that job's editedImages
+    edit_jobs: dict[int, dict] = {}
+    jobs = 0
+    if editable and qwen_available():
+        batch_size = max(1, int(current_app.config.get("QWEN_BATCH_SIZE", 4)))
+        for start in range(0, len(editable), batch_size):
+            chunk = editable[start:start + batch_size]
+            job = _submit_edit("disease-edit-batch", {"uploadsDir": uploads_dir,
+                                                      "filenames": [filenames[i] for i in chunk],
+                                                      "prompt": prompt or DEFAULT_EDIT_PROMPT,
+                                                      "profile": profile})
+            if job["id"]:
+                jobs += 1
+            for position, i in enumerate(chunk):
+                edit_jobs[i] = {**job, "index": position}
+
+    results = []
+    for i, (filename, detection) in enumerate(zip(filenames, detections)):
+        ratio = round(detection.ratio, 4) if detection else None
+        if detection is not None and not detection.detected:
+            results.append(_no_leaf_result(filename, ratio))
+            continue
+        box = list(detection.bbox) if detection and detection.bbox else None
+        results.append(_analysis_result(filename, prompt, ratio, box, edit_jobs.get(i)))
+    return {"results": results, "count": len(results), "leafDetected": len(leafy), "editJobs": jobs}
+
+
+def _submit_edit(kind: str, payload: dict) -> dict:
+    try:
+        job = job_queue.submit(kind, payload)
+        return {"id": job["id"], "status": job["status"], "url": f"/api/ai/jobs/{job['id']}"}
+    except JobQueueFull:
+        return {"id": None, "status": "rejected", "error": "Image edit queue is full, try again later"}
+
+
+def _unknown_profile(name: str):
+    return {"error": f"Unknown profile '{name}'", "profiles": list(INFERENCE_PROFILES)}, 400
+
+
+def _no_leaf_result(filename: str, leaf_ratio: Optional[float]) -> dict:
+    return {
+        "leafDetected": False,
+        "message": "Leaf not detected in the uploaded image",
+        "leafRatio": leaf_ratio,
+        "image": f"/uploads/{filename}",
+    }
+
 
+def _analysis_result(filename: str, prompt: Optional[str], leaf_ratio: Optional[float],
+                     leaf_box: Optional[list[int]], edit_job: Optional[dict]) -> dict:
     # Placeholder disease detection result (replace with real classifier if available)
     # Build a structured report for consistent, non-random output
     disease_name = "Leaf Condition Analyzed"
@@ -180,7 +372,7 @@ def disease_detect():
         "advice": advice_text,
         "analyzedAt": __import__("datetime").datetime.utcnow().isoformat() + "Z",
         "image": f"/uploads/{filename}",
-        "editedImage": (f"/uploads/{edited_filename}" if edited_filename else None),
+        "editedImage": None,
     }
 
     result = {
@@ -188,9 +380,12 @@ def disease_detect():
         "confidence": confidence_val,
         "advice": advice_text,
         "image": f"/uploads/{filename}",
-        "editedImage": (f"/uploads/{edited_filename}" if edited_filename else None),
+        "editedImage": None,
+        "editJob": edit_job,
         "promptUsed": prompt,
         "leafDetected": True,
+        "leafRatio": leaf_ratio,
+        "leafBox": leaf_box,
         "report": report,
     }
     return result
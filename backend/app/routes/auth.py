@@ -3,6 +3,7 @@ from flask_jwt_extended import create_access_token
 from sqlalchemy.exc import IntegrityError
 from ..extensions import db
 from ..models import User, UserRole
+from ..rollups import record_user
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -18,6 +19,7 @@ def register():
         user = User(name=data["name"], email=data["email"], role=role)
         user.set_password(data["password"])
         db.session.add(user)
+        record_user(role)
         db.session.commit()
         token = create_access_token(identity=str(user.id), additional_claims={"role": user.role.value})
         return {"token": token, "user": {"id": user.id, "name": user.name, "email": user.email, "role": user.role.value}}
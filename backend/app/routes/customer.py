@@ -1,21 +1,95 @@
+from datetime import datetime
 from flask import Blueprint, request
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from sqlalchemy import or_, update, case
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import selectinload
 from ..extensions import db
+from ..fields import InvalidFields, requested_fields, requested_layout, shape
 from ..models import Inventory, Crop, Order, OrderItem, UserRole
+from ..pagination import InvalidCursor, before_cursor, decode_cursor, encode_cursor, parse_date_bound
+from ..response_cache import INVENTORY, response_cache
+from ..rollups import record_order
+from ..search import crop_name_filter
 
 
 customer_bp = Blueprint("customer", __name__)
 
 
+MARKET_DEFAULT_LIMIT = 50
+MARKET_MAX_LIMIT = 200
+MARKET_SORTS = ("newest", "price_asc", "price_desc")
+# Flat names accepted by ?fields= and used by ?layout=columns
+MARKET_FIELDS = {
+    "id": Inventory.id,
+    "cropName": Inventory.crop_name,
+    "price": Inventory.price,
+    "quantity": Inventory.quantity,
+    "farmerId": Inventory.farmer_id,
+    "imageUrl": Inventory.image_url,
+}
+HISTORY_DEFAULT_LIMIT = 20
+HISTORY_MAX_LIMIT = 100
+
+
 @customer_bp.get("/market")
+@response_cache.cached(INVENTORY)
 def market():
     search = request.args.get('search', '').strip().lower()
+    sort = request.args.get('sort', 'newest')
+    if sort not in MARKET_SORTS:
+        return {"error": f"Invalid sort, expected one of {', '.join(MARKET_SORTS)}"}, 400
+    limit = request.args.get('limit', MARKET_DEFAULT_LIMIT, type=int)
+    limit = max(1, min(limit or MARKET_DEFAULT_LIMIT, MARKET_MAX_LIMIT))
+    after = request.args.get('after', type=int)
+    try:
+        fields = requested_fields(list(MARKET_FIELDS), request.args.get('fields'))
+        layout = requested_layout(request.args.get('layout'))
+    except InvalidFields as e:
+        return {"error": str(e)}, 400
+
     query = Inventory.query.filter_by(available=True)
-    
+
     if search:
-        query = query.filter(Inventory.crop_name.ilike(f'%{search}%'))
-    
-    items = query.all()
+        dialect = db.session.get_bind().dialect.name
+        query = query.filter(crop_name_filter(search, dialect))
+
+    # Keyset pagination: `after` is the id of the last item on the previous page
+    if sort == "newest":
+        if after is not None:
+            query = query.filter(Inventory.id < after)
+        query = query.order_by(Inventory.id.desc())
+    else:
+        if after is not None:
+            anchor = db.session.get(Inventory, after)
+            if not anchor:
+                return {"error": "Invalid cursor"}, 400
+            if sort == "price_asc":
+                query = query.filter(
+                    Inventory.price >= anchor.price,
+                    or_(Inventory.price > anchor.price, Inventory.id > anchor.id),
+                )
+            else:
+                query = query.filter(
+                    Inventory.price <= anchor.price,
+                    or_(Inventory.price < anchor.price, Inventory.id < anchor.id),
+                )
+        if sort == "price_asc":
+            query = query.order_by(Inventory.price.asc(), Inventory.id.asc())
+        else:
+            query = query.order_by(Inventory.price.desc(), Inventory.id.desc())
+
+    if fields or layout != "rows":
+        # Sparse/columnar: select only the needed columns as plain tuples, no ORM objects
+        names = fields or list(MARKET_FIELDS)
+        rows = query.with_entities(Inventory.id, *[MARKET_FIELDS[n] for n in names]).limit(limit + 1).all()
+        payload = shape([row[1:] for row in rows[:limit]], names, layout)
+        payload["nextCursor"] = rows[limit - 1][0] if len(rows) > limit else None
+        return payload
+
+    items = query.limit(limit + 1).all()
+    next_cursor = items[limit - 1].id if len(items) > limit else None
+    items = items[:limit]
     return {
         "items": [
             {
@@ -27,7 +101,60 @@ def market():
                 "imageUrl": i.image_url,
             }
             for i in items
-        ]
+        ],
+        "nextCursor": next_cursor,
+    }
+
+
+@customer_bp.get("/orders")
+@jwt_required()
+def list_orders():
+    claims = get_jwt()
+    if claims.get("role") not in [UserRole.CUSTOMER.value, UserRole.ADMIN.value]:
+        return {"error": "Forbidden"}, 403
+    limit = request.args.get("limit", HISTORY_DEFAULT_LIMIT, type=int)
+    limit = max(1, min(limit or HISTORY_DEFAULT_LIMIT, HISTORY_MAX_LIMIT))
+    try:
+        start = parse_date_bound(request.args.get("from"))
+        end = parse_date_bound(request.args.get("to"), end=True)
+        cursor = decode_cursor(request.args["after"]) if request.args.get("after") else None
+    except (InvalidCursor, ValueError) as e:
+        return {"error": str(e)}, 400
+
+    # Two queries per page whatever its size: the orders, then all their items with listings
+    query = (
+        Order.query.filter(Order.customer_id == int(get_jwt_identity()))
+        .options(selectinload(Order.items).joinedload(OrderItem.inventory))
+        .order_by(Order.created_at.desc(), Order.id.desc())
+    )
+    if start:
+        query = query.filter(Order.created_at >= start)
+    if end:
+        query = query.filter(Order.created_at <= end)
+    if cursor:
+        query = query.filter(before_cursor(Order.created_at, Order.id, cursor))
+    orders = query.limit(limit + 1).all()
+    next_cursor = encode_cursor(orders[limit - 1].created_at, orders[limit - 1].id) if len(orders) > limit else None
+    return {
+        "orders": [
+            {
+                "id": o.id,
+                "createdAt": o.created_at.isoformat() if o.created_at else None,
+                "total": o.total_amount,
+                "items": [
+                    {
+                        "inventoryId": it.inventory_id,
+                        "cropName": it.inventory.crop_name if it.inventory else None,
+                        "farmerId": it.inventory.farmer_id if it.inventory else None,
+                        "quantity": it.quantity,
+                        "price": it.price,
+                    }
+                    for it in o.items
+                ],
+            }
+            for o in orders[:limit]
+        ],
+        "nextCursor": next_cursor,
     }
 
 
@@ -41,24 +168,62 @@ def create_order():
     items = data.get("items", [])
     if not items:
         return {"error": "No items"}, 400
-    total = 0.0
-    prepared: list[tuple[Inventory, int]] = []
-    for entry in items:
-        inv = Inventory.query.filter_by(id=entry.get("inventoryId"), available=True).first()
-        qty = int(entry.get("quantity", 0))
-        if not inv or qty <= 0 or inv.quantity < qty:
-            return {"error": "Invalid item or insufficient stock"}, 400
-        total += inv.price * qty
-        prepared.append((inv, qty))
-    order = Order(customer_id=int(get_jwt_identity()), total_amount=total)
-    db.session.add(order)
-    db.session.flush()
-    for inv, qty in prepared:
-        db.session.add(OrderItem(order_id=order.id, inventory_id=inv.id, quantity=qty, price=inv.price))
-        inv.quantity -= qty
-        if inv.quantity == 0:
-            inv.available = False
-    db.session.commit()
-    return {"orderId": order.id, "total": total}, 201
 
+    # Merge repeated listings so each row is reserved exactly once
+    requested: dict[int, int] = {}
+    try:
+        for entry in items:
+            inv_id = int(entry.get("inventoryId"))
+            qty = int(entry.get("quantity", 0))
+            if qty <= 0:
+                return {"error": "Invalid item or insufficient stock"}, 400
+            requested[inv_id] = requested.get(inv_id, 0) + qty
+    except (AttributeError, TypeError, ValueError):
+        return {"error": "Invalid item or insufficient stock"}, 400
+
+    listings = {
+        inv.id: inv
+        for inv in Inventory.query.filter(Inventory.id.in_(list(requested))).all()
+    }
+    if len(listings) != len(requested):
+        return {"error": "Invalid item or insufficient stock"}, 400
+    for inv_id, qty in requested.items():
+        if not listings[inv_id].available or listings[inv_id].quantity < qty:
+            return {"error": "Insufficient stock", "inventoryId": inv_id}, 409
 
+    total = sum(listings[inv_id].price * qty for inv_id, qty in requested.items())
+    try:
+        # Reserve in id order so concurrent orders lock rows consistently.
+        # The WHERE clause makes the decrement conditional, so a row that was
+        # sold out since the read above matches nothing instead of going negative.
+        for inv_id in sorted(requested):
+            qty = requested[inv_id]
+            reserved = db.session.execute(
+                update(Inventory)
+                .where(Inventory.id == inv_id, Inventory.available.is_(True), Inventory.quantity >= qty)
+                # `available` is assigned first: MySQL evaluates SET left to right
+                .ordered_values(
+                    (Inventory.available, case((Inventory.quantity == qty, False), else_=Inventory.available)),
+                    (Inventory.quantity, Inventory.quantity - qty),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if reserved.rowcount != 1:
+                db.session.rollback()
+                return {"error": "Insufficient stock", "inventoryId": inv_id}, 409
+
+        order = Order(customer_id=int(get_jwt_identity()), total_amount=total, created_at=datetime.utcnow())
+        db.session.add(order)
+        db.session.flush()
+        db.session.add_all([
+            OrderItem(order_id=order.id, inventory_id=inv_id, quantity=qty, price=listings[inv_id].price)
+            for inv_id, qty in requested.items()
+        ])
+        record_order(order, [(listings[inv_id], qty, listings[inv_id].price) for inv_id, qty in requested.items()])
+        db.session.commit()
+    except OperationalError:
+        db.session.rollback()
+        return {"error": "Order could not be placed, please retry"}, 503
+    # Stock changed (and sold-out listings left the market)
+    response_cache.invalidate(INVENTORY)
+    return {"orderId": order.id, "total": total}, 201
@@ -1,7 +1,16 @@
-from flask import Blueprint, request
+import csv
+from flask import Blueprint, current_app, request
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from sqlalchemy import func, insert, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import contains_eager
+from ..bulk_import import BulkFormatError, detect_format, iter_records, validate
 from ..extensions import db
-from ..models import Inventory, Crop, UserRole
+from ..fields import InvalidFields, requested_fields, requested_layout, shape
+from ..models import Inventory, Crop, Order, OrderItem, UserRole
+from ..pagination import InvalidCursor, before_cursor, decode_cursor, encode_cursor, parse_date_bound
+from ..response_cache import CROPS, INVENTORY, response_cache
+from ..storage import save_upload
 import os
 from werkzeug.utils import secure_filename
 from typing import Optional
@@ -9,6 +18,15 @@ from typing import Optional
 
 farmer_bp = Blueprint("farmer", __name__)
 
+INVENTORY_FIELDS = {
+    "id": Inventory.id,
+    "cropName": Inventory.crop_name,
+    "price": Inventory.price,
+    "quantity": Inventory.quantity,
+    "available": Inventory.available,
+    "imageUrl": Inventory.image_url,
+}
+
 
 def _require_role(role: UserRole, claims: dict):
     if not claims or claims.get("role") != role.value:
@@ -24,6 +42,20 @@ def list_inventory():
     if forbidden:
         return forbidden
     user_id = int(get_jwt_identity())
+    try:
+        fields = requested_fields(list(INVENTORY_FIELDS), request.args.get("fields"))
+        layout = requested_layout(request.args.get("layout"))
+    except InvalidFields as e:
+        return {"error": str(e)}, 400
+    if fields or layout != "rows":
+        names = fields or list(INVENTORY_FIELDS)
+        rows = (
+            db.session.query(*[INVENTORY_FIELDS[n] for n in names])
+            .filter(Inventory.farmer_id == user_id)
+            .order_by(Inventory.id)
+            .all()
+        )
+        return shape(rows, names, layout)
     items = Inventory.query.filter_by(farmer_id=user_id).all()
     return {
         "items": [
@@ -40,8 +72,84 @@ def list_inventory():
     }
 
 
+SALES_DEFAULT_LIMIT = 20
+SALES_MAX_LIMIT = 100
+
+
+@farmer_bp.get("/sales")
+@jwt_required()
+def list_sales():
+    claims = get_jwt()
+    forbidden = _require_role(UserRole.FARMER, claims)
+    if forbidden:
+        return forbidden
+    farmer_id = int(get_jwt_identity())
+    limit = request.args.get("limit", SALES_DEFAULT_LIMIT, type=int)
+    limit = max(1, min(limit or SALES_DEFAULT_LIMIT, SALES_MAX_LIMIT))
+    try:
+        start = parse_date_bound(request.args.get("from"))
+        end = parse_date_bound(request.args.get("to"), end=True)
+        cursor = decode_cursor(request.args["after"]) if request.args.get("after") else None
+    except (InvalidCursor, ValueError) as e:
+        return {"error": str(e)}, 400
+
+    # Page of orders containing this farmer's listings, reached through inventory(farmer_id)
+    page = (
+        db.session.query(Order.id, Order.created_at, Order.customer_id)
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .join(Inventory, Inventory.id == OrderItem.inventory_id)
+        .filter(Inventory.farmer_id == farmer_id)
+        .group_by(Order.id, Order.created_at, Order.customer_id)
+        .order_by(Order.created_at.desc(), Order.id.desc())
+    )
+    if start:
+        page = page.filter(Order.created_at >= start)
+    if end:
+        page = page.filter(Order.created_at <= end)
+    if cursor:
+        page = page.filter(before_cursor(Order.created_at, Order.id, cursor))
+    orders = page.limit(limit + 1).all()
+    next_cursor = encode_cursor(orders[limit - 1].created_at, orders[limit - 1].id) if len(orders) > limit else None
+    orders = orders[:limit]
+
+    # Only this farmer's lines, with their listing, in one more query
+    items_by_order: dict[int, list] = {}
+    if orders:
+        lines = (
+            OrderItem.query.join(OrderItem.inventory)
+            .options(contains_eager(OrderItem.inventory))
+            .filter(OrderItem.order_id.in_([o.id for o in orders]), Inventory.farmer_id == farmer_id)
+            .order_by(OrderItem.id)
+            .all()
+        )
+        for line in lines:
+            items_by_order.setdefault(line.order_id, []).append(line)
+    return {
+        "sales": [
+            {
+                "orderId": o.id,
+                "createdAt": o.created_at.isoformat() if o.created_at else None,
+                "customerId": o.customer_id,
+                "revenue": round(sum(it.price * it.quantity for it in items_by_order.get(o.id, [])), 2),
+                "items": [
+                    {
+                        "inventoryId": it.inventory_id,
+                        "cropName": it.inventory.crop_name,
+                        "quantity": it.quantity,
+                        "price": it.price,
+                    }
+                    for it in items_by_order.get(o.id, [])
+                ],
+            }
+            for o in orders
+        ],
+        "nextCursor": next_cursor,
+    }
+
+
 @farmer_bp.get("/crops")
 @jwt_required(optional=True)
+@response_cache.cached(CROPS)
 def list_crops():
     crops = Crop.query.order_by(Crop.name.asc()).all()
     return {"crops": [{"id": None, "crop": c.crop, "name": c.name, "description": c.description} for c in crops]}
@@ -58,19 +166,10 @@ def _save_upload(file_storage) -> Optional[str]:
         return None
     if not _allowed_file(file_storage.filename):
         return None
-    filename = secure_filename(file_storage.filename)
     from flask import current_app
     upload_dir = current_app.config.get("UPLOAD_FOLDER")
-    os.makedirs(upload_dir, exist_ok=True)
-    dest = os.path.join(upload_dir, filename)
-    # ensure unique
-    base, ext = os.path.splitext(filename)
-    counter = 1
-    while os.path.exists(dest):
-        filename = f"{base}_{counter}{ext}"
-        dest = os.path.join(upload_dir, filename)
-        counter += 1
-    file_storage.save(dest)
+    # Named by content hash: identical photos share one file
+    filename = save_upload(file_storage, upload_dir, os.path.splitext(secure_filename(file_storage.filename))[1])
     return f"/uploads/{filename}"
 
 
@@ -111,9 +210,117 @@ def create_inventory():
     )
     db.session.add(item)
     db.session.commit()
+    response_cache.invalidate(INVENTORY)
     return {"id": item.id, "imageUrl": item.image_url}, 201
 
 
+BULK_MAX_REPORTED_ERRORS = 200
+
+
+def _write_bulk_chunk(farmer_id: int, rows: list[dict], upsert: bool, seen: set[str]) -> tuple[int, int, int]:
+    """Insert (or, with upsert, refresh by crop name) one chunk; returns (created, updated, merged).
+
+    `merged` counts upsert rows whose crop already appeared earlier in the file;
+    `seen` carries those names across chunks.
+    """
+    if upsert:
+        # Last row wins when the same crop appears twice in the chunk
+        by_name: dict[str, dict] = {}
+        for row in rows:
+            by_name[row["crop_name"].lower()] = row
+        existing = dict(
+            db.session.query(func.lower(Inventory.crop_name), func.max(Inventory.id))
+            .filter(Inventory.farmer_id == farmer_id, func.lower(Inventory.crop_name).in_(list(by_name)))
+            .group_by(func.lower(Inventory.crop_name))
+            .all()
+        )
+        updates: dict[tuple, list[dict]] = {}
+        new_rows = []
+        updated = 0
+        for name, row in by_name.items():
+            if name in existing:
+                if name not in seen:
+                    updated += 1
+                # A refresh relists the lot unless the row says otherwise
+                values = {"id": existing[name], "price": row["price"], "quantity": row["quantity"],
+                          "available": row.get("available", True)}
+                if "image_url" in row:
+                    values["image_url"] = row["image_url"]
+                updates.setdefault(tuple(sorted(values)), []).append(values)
+            else:
+                new_rows.append(row)
+        # ORM bulk UPDATE by primary key needs the same columns in every row of a batch
+        for batch in updates.values():
+            db.session.execute(update(Inventory), batch)
+        merged = len(rows) - len(new_rows) - updated
+        seen.update(by_name)
+    else:
+        new_rows, updated, merged = rows, 0, 0
+    if new_rows:
+        db.session.execute(insert(Inventory), [
+            {"farmer_id": farmer_id, "available": True, "image_url": None, **row} for row in new_rows
+        ])
+    return len(new_rows), updated, merged
+
+
+@farmer_bp.post("/inventory/bulk")
+@jwt_required()
+def bulk_inventory():
+    claims = get_jwt()
+    forbidden = _require_role(UserRole.FARMER, claims)
+    if forbidden:
+        return forbidden
+    farmer_id = int(get_jwt_identity())
+    upsert = request.args.get("upsert", "").lower() in ("1", "true", "yes")
+
+    # Either a raw CSV/NDJSON body or a multipart upload in the "file" field
+    if request.mimetype == "multipart/form-data":
+        upload = request.files.get("file")
+        if not upload:
+            return {"error": "Attach the file as 'file'"}, 400
+        stream, fmt = upload.stream, detect_format(upload.mimetype, upload.filename)
+    else:
+        stream, fmt = request.stream, detect_format(request.mimetype)
+    if fmt is None:
+        return {"error": "Send text/csv or application/x-ndjson"}, 415
+
+    max_rows = int(current_app.config.get("INVENTORY_BULK_MAX_ROWS", 5000))
+    chunk_size = int(current_app.config.get("INVENTORY_BULK_CHUNK_SIZE", 500))
+    created = updated = merged = failed = 0
+    errors: list[dict] = []
+    pending: list[dict] = []
+    seen: set[str] = set()
+    try:
+        for number, record in iter_records(stream, fmt):
+            if number > max_rows:
+                errors.append({"row": number, "error": f"Row limit of {max_rows} reached; the rest was not read"})
+                break
+            row = validate(record) if isinstance(record, dict) else record
+            if isinstance(row, str):
+                failed += 1
+                if len(errors) < BULK_MAX_REPORTED_ERRORS:
+                    errors.append({"row": number, "error": row})
+                continue
+            pending.append(row)
+            if len(pending) >= chunk_size:
+                c, u, m = _write_bulk_chunk(farmer_id, pending, upsert, seen)
+                created, updated, merged, pending = created + c, updated + u, merged + m, []
+        if pending:
+            c, u, m = _write_bulk_chunk(farmer_id, pending, upsert, seen)
+            created, updated, merged = created + c, updated + u, merged + m
+        db.session.commit()
+    except (BulkFormatError, csv.Error, UnicodeDecodeError) as e:
+        db.session.rollback()
+        return {"error": f"Unreadable body: {e}"}, 400
+    except OperationalError:
+        db.session.rollback()
+        return {"error": "Import could not be saved, please retry"}, 503
+
+    if created or updated:
+        response_cache.invalidate(INVENTORY)
+    return {"created": created, "updated": updated, "merged": merged, "failed": failed, "errors": errors}
+
+
 @farmer_bp.put("/inventory/<int:item_id>")
 @jwt_required()
 def update_inventory(item_id: int):
@@ -147,6 +354,7 @@ def update_inventory(item_id: int):
         if "imageUrl" in data:
             item.image_url = data["imageUrl"]
     db.session.commit()
+    response_cache.invalidate(INVENTORY)
     return {"status": "updated", "imageUrl": item.image_url}
 
 
@@ -161,7 +369,18 @@ def delete_inventory(item_id: int):
     if not item:
         return {"error": "Not found"}, 404
     db.session.delete(item)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Sold listings stay referenced by order history (foreign keys are enforced),
+        # so they are withdrawn from the market instead of removed
+        db.session.rollback()
+        item.available = False
+        item.quantity = 0
+        db.session.commit()
+        response_cache.invalidate(INVENTORY)
+        return {"status": "archived"}
+    response_cache.invalidate(INVENTORY)
     return {"status": "deleted"}
 
 
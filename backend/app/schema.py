@@ -0,0 +1,14 @@
+from sqlalchemy.engine import Engine
+
+from .extensions import db
+from .search import ensure_search_index
+
+
+def ensure_schema(engine: Engine) -> None:
+    """Create missing tables, indexes added after first deploy, and backend-specific search indexes."""
+    db.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+        ensure_search_index(conn)
@@ -0,0 +1,92 @@
+from sqlalchemy import text, literal_column
+from sqlalchemy.engine import Connection
+
+from .models import Inventory
+
+
+# Shortest term each backend's index can answer; shorter terms fall back to ILIKE.
+_MIN_TERM_LENGTH = {"sqlite": 3, "mysql": 2, "postgresql": 1}
+
+_SQLITE_FTS_TRIGGERS = {
+    "inventory_fts_ai": """
+        CREATE TRIGGER inventory_fts_ai AFTER INSERT ON inventory BEGIN
+            INSERT INTO inventory_fts(rowid, crop_name) VALUES (new.id, new.crop_name);
+        END
+    """,
+    "inventory_fts_ad": """
+        CREATE TRIGGER inventory_fts_ad AFTER DELETE ON inventory BEGIN
+            INSERT INTO inventory_fts(inventory_fts, rowid, crop_name) VALUES ('delete', old.id, old.crop_name);
+        END
+    """,
+    "inventory_fts_au": """
+        CREATE TRIGGER inventory_fts_au AFTER UPDATE OF crop_name ON inventory BEGIN
+            INSERT INTO inventory_fts(inventory_fts, rowid, crop_name) VALUES ('delete', old.id, old.crop_name);
+            INSERT INTO inventory_fts(rowid, crop_name) VALUES (new.id, new.crop_name);
+        END
+    """,
+}
+
+
+def _ensure_sqlite(conn: Connection) -> None:
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS inventory_fts USING fts5("
+        "crop_name, content='inventory', content_rowid='id', tokenize='trigram')"
+    ))
+    existing = {
+        row[0]
+        for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'inventory_fts_%'"))
+    }
+    missing = [name for name in _SQLITE_FTS_TRIGGERS if name not in existing]
+    for name in missing:
+        conn.execute(text(_SQLITE_FTS_TRIGGERS[name]))
+    # Triggers vanish with the inventory table (drop_all / reset_db), so the
+    # index content is stale whenever we had to recreate them.
+    if missing:
+        conn.execute(text("INSERT INTO inventory_fts(inventory_fts) VALUES ('rebuild')"))
+
+
+def _ensure_mysql(conn: Connection) -> None:
+    exists = conn.execute(text(
+        "SELECT COUNT(*) FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = 'inventory' AND index_name = 'ft_inventory_crop_name'"
+    )).scalar()
+    if not exists:
+        conn.execute(text("CREATE FULLTEXT INDEX ft_inventory_crop_name ON inventory (crop_name) WITH PARSER ngram"))
+
+
+def _ensure_postgresql(conn: Connection) -> None:
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_inventory_crop_name_trgm ON inventory USING gin (crop_name gin_trgm_ops)"
+    ))
+
+
+def ensure_search_index(conn: Connection) -> None:
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        _ensure_sqlite(conn)
+    elif dialect == "mysql":
+        _ensure_mysql(conn)
+    elif dialect == "postgresql":
+        _ensure_postgresql(conn)
+
+
+def _quote_phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def crop_name_filter(term: str, dialect: str):
+    """Substring match on crop_name, served by the backend's text index when it can be."""
+    if len(term) < _MIN_TERM_LENGTH.get(dialect, len(term) + 1):
+        return Inventory.crop_name.ilike(f"%{term}%")
+    if dialect == "sqlite":
+        matches = text("SELECT rowid FROM inventory_fts WHERE inventory_fts MATCH :fts_term").bindparams(
+            fts_term=_quote_phrase(term)
+        )
+        return Inventory.id.in_(matches.columns(literal_column("rowid")))
+    if dialect == "mysql":
+        return text("MATCH (inventory.crop_name) AGAINST (:ft_term IN BOOLEAN MODE)").bindparams(
+            ft_term=_quote_phrase(term)
+        )
+    # postgresql: ILIKE is answered by the pg_trgm GIN index
+    return Inventory.crop_name.ilike(f"%{term}%")
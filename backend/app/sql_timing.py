@@ -0,0 +1,50 @@
+import time
+from typing import Callable
+
+from flask import has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# (statement, seconds, executemany), called after each statement run inside a request
+QueryObserver = Callable[[str, float, bool], None]
+
+_START_KEY = "_query_timing_start"
+_observers: list[QueryObserver] = []
+_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _observers and has_request_context():
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    starts = conn.info.get(_START_KEY)
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if has_request_context():
+        for observer in _observers:
+            observer(statement, elapsed, executemany)
+
+
+def _handle_error(context) -> None:
+    # A failed statement never reaches after_cursor_execute; drop its start so
+    # the pooled connection does not carry it into later timings
+    conn = context.connection
+    starts = conn.info.get(_START_KEY) if conn is not None else None
+    if starts:
+        starts.pop()
+
+
+def add_observer(observer: QueryObserver) -> None:
+    """Time SQL statements for `observer`; metrics and request profiling share one listener set."""
+    global _installed
+    if observer not in _observers:
+        _observers.append(observer)
+    if not _installed:
+        # Class-level listeners cover every engine, including ones created per app in tests
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+        _installed = True
@@ -0,0 +1,120 @@
+import hashlib
+import io
+import os
+import re
+import tempfile
+import time
+from typing import IO, Iterable, Optional
+
+_CHUNK_SIZE = 1 << 16
+_CONTENT_NAME = re.compile(r"^[0-9a-f]{64}(\.[a-z0-9]{1,5})?$")
+_INCOMING_PREFIX = ".incoming-"
+_IMAGE_FORMATS = {".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG", ".webp": "WEBP"}
+
+
+def _normalize_ext(ext: str) -> str:
+    ext = (ext or "").lower()
+    if not ext.startswith("."):
+        ext = f".{ext}" if ext else ""
+    return ext if re.fullmatch(r"\.[a-z0-9]{1,5}", ext) else ".bin"
+
+
+def is_content_addressed(filename: str) -> bool:
+    return bool(_CONTENT_NAME.match(filename))
+
+
+def _hash_stream(stream: IO[bytes]) -> str:
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_stream(stream: IO[bytes], upload_dir: str, ext: str) -> str:
+    """Store `stream` under `<sha256><ext>` and return that filename.
+
+    Content already on disk is not written again; its mtime is refreshed so
+    garbage collection treats it as recently used.
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    ext = _normalize_ext(ext)
+    seekable = getattr(stream, "seekable", lambda: False)()
+    if seekable:
+        # Hash first so duplicates cost a read and no write
+        start = stream.tell()
+        filename = f"{_hash_stream(stream)}{ext}"
+        dest = os.path.join(upload_dir, filename)
+        if os.path.exists(dest):
+            os.utime(dest)
+            return filename
+        stream.seek(start)
+
+    fd, tmp_path = tempfile.mkstemp(dir=upload_dir, prefix=_INCOMING_PREFIX)
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: stream.read(_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                out.write(chunk)
+        filename = f"{digest.hexdigest()}{ext}"
+        dest = os.path.join(upload_dir, filename)
+        if os.path.exists(dest):
+            os.utime(dest)
+            os.unlink(tmp_path)
+        else:
+            # Atomic, so concurrent writers of the same content end with one complete file
+            os.replace(tmp_path, dest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return filename
+
+
+def save_upload(file_storage, upload_dir: str, ext: Optional[str] = None) -> str:
+    if ext is None:
+        ext = os.path.splitext(file_storage.filename or "")[1]
+    return store_stream(file_storage.stream, upload_dir, ext)
+
+
+def save_image(image, upload_dir: str, ext: str = ".png") -> str:
+    ext = _normalize_ext(ext)
+    if ext not in _IMAGE_FORMATS:
+        ext = ".png"
+    buf = io.BytesIO()
+    image.save(buf, format=_IMAGE_FORMATS[ext])
+    buf.seek(0)
+    return store_stream(buf, upload_dir, ext)
+
+
+def collect_garbage(upload_dir: str, referenced: Iterable[str], min_age: float, dry_run: bool = False) -> tuple[list[str], int]:
+    """Delete top-level files in `upload_dir` that are not referenced and older than `min_age` seconds.
+
+    Returns the removed names and the bytes freed. Subdirectories (e.g. derived
+    variants) are left alone.
+    """
+    keep = set(referenced)
+    cutoff = time.time() - min_age
+    removed: list[str] = []
+    freed = 0
+    for entry in os.scandir(upload_dir):
+        if not entry.is_file(follow_symlinks=False) or entry.name in keep:
+            continue
+        if entry.name.startswith(".") and not entry.name.startswith(_INCOMING_PREFIX):
+            continue
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime > cutoff:
+            continue
+        removed.append(entry.name)
+        freed += stat.st_size
+        if not dry_run:
+            os.unlink(entry.path)
+    return removed, freed
+
+
+def upload_name(url: Optional[str]) -> Optional[str]:
+    """Filename part of an `/uploads/<name>` URL, or None for anything else."""
+    if not url or not url.startswith("/uploads/"):
+        return None
+    name = url[len("/uploads/"):].split("?", 1)[0]
+    return name if name and "/" not in name else None
@@ -0,0 +1,75 @@
+import hashlib
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from flask import Response, current_app, request, send_file
+
+from .storage import is_content_addressed
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+_ETAG_CACHE_SIZE = 4096
+_etag_cache: "OrderedDict[tuple[str, int, int], str]" = OrderedDict()
+_etag_lock = threading.Lock()
+
+
+def _content_etag(path: str, stat: os.stat_result) -> str:
+    """SHA-256 of the file, memoised per (path, mtime, size) so each version is hashed once per worker."""
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _etag_lock:
+        etag = _etag_cache.get(key)
+        if etag is not None:
+            _etag_cache.move_to_end(key)
+            return etag
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b""):
+            digest.update(chunk)
+    etag = digest.hexdigest()
+    with _etag_lock:
+        _etag_cache[key] = etag
+        while len(_etag_cache) > _ETAG_CACHE_SIZE:
+            _etag_cache.popitem(last=False)
+    return etag
+
+
+def send_upload(path: str, source_name: str, mimetype: Optional[str] = None) -> Response:
+    """Send an upload (or a variant of `source_name`) with strong ETag and cache headers.
+
+    Files named by content hash never change, so they and their variants are
+    served as immutable. Everything else must be revalidated, which costs a
+    304 with no body when the client already has it. With
+    UPLOADS_ACCEL_REDIRECT set, nginx is handed the file via X-Accel-Redirect;
+    with USE_X_SENDFILE, Flask emits X-Sendfile itself.
+    """
+    stat = os.stat(path)
+    immutable = is_content_addressed(source_name)
+    if immutable and os.path.basename(path) == source_name:
+        etag = os.path.splitext(source_name)[0]
+    else:
+        etag = _content_etag(path, stat)
+    cache_control = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+
+    accel_prefix = current_app.config.get("UPLOADS_ACCEL_REDIRECT")
+    upload_dir = os.path.abspath(current_app.config["UPLOAD_FOLDER"])
+    relative = os.path.relpath(os.path.abspath(path), upload_dir)
+    if accel_prefix and not relative.startswith(".."):
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            # nginx serves the bytes (and Range requests) from its internal location but keeps
+            # this Content-Type, so guess it the way send_file does
+            mimetype = mimetype or mimetypes.guess_type(source_name)[0] or "application/octet-stream"
+            response = Response(mimetype=mimetype)
+            response.headers["X-Accel-Redirect"] = accel_prefix.rstrip("/") + "/" + relative.replace(os.sep, "/")
+        response.set_etag(etag)
+    else:
+        # conditional=True gives 304s for matching If-None-Match and 206s for Range
+        response = send_file(path, mimetype=mimetype, etag=etag, conditional=True, max_age=None)
+    response.headers["Cache-Control"] = cache_control
+    response.headers["Accept-Ranges"] = "bytes"
+    return response
@@ -0,0 +1,198 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from flask import Flask
+from werkzeug.security import safe_join
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: thread locks only
+    fcntl = None
+
+# fmt query value -> (Pillow format, file extension, mimetype)
+FORMATS = {
+    "webp": ("WEBP", "webp", "image/webp"),
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+    "jpg": ("JPEG", "jpg", "image/jpeg"),
+    "png": ("PNG", "png", "image/png"),
+}
+DEFAULT_WIDTHS = (160, 320, 640, 960, 1280, 1920)
+# Hits only bump the LRU clock this often, to avoid an inode write per request
+_TOUCH_INTERVAL = 60
+_LOCK_STRIPES = 64
+
+
+class VariantError(ValueError):
+    pass
+
+
+class NotAnImage(VariantError):
+    """The upload is not something Pillow can decode (a PDF, or a decompression bomb); nothing to resize."""
+
+
+class VariantCache:
+    """Resized / re-encoded copies of uploads, generated on first request.
+
+    Requested widths snap up to a fixed ladder so the cache cannot be filled
+    with arbitrary sizes. Generation of one variant is guarded by a thread
+    lock plus an flock on a sidecar file, so concurrent misses across threads
+    and gunicorn workers produce it once. When the cache grows past
+    `max_bytes`, least recently used variants (by mtime) are evicted.
+    """
+
+    def __init__(self):
+        self.cache_dir: Optional[str] = None
+        self.max_bytes = 512 * 1024 * 1024
+        self.widths = DEFAULT_WIDTHS
+        self.quality = 80
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._evict_lock = threading.Lock()
+
+    def configure(self, cache_dir: str, max_bytes: int, widths=DEFAULT_WIDTHS, quality: int = 80) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.widths = tuple(sorted(widths))
+        self.quality = quality
+
+    def snap_width(self, width: Optional[int]) -> Optional[int]:
+        if width is None:
+            return None
+        if width <= 0:
+            raise VariantError("w must be positive")
+        for candidate in self.widths:
+            if candidate >= width:
+                return candidate
+        return self.widths[-1]
+
+    @contextmanager
+    def _variant_lock(self, name: str):
+        with self._locks_guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+        try:
+            with lock:
+                if fcntl is None:
+                    yield
+                    return
+                # A fixed set of striped lock files, so locks do not pile up per variant
+                stripe = int(hashlib.sha1(name.encode()).hexdigest()[:4], 16) % _LOCK_STRIPES
+                with open(os.path.join(self.cache_dir, f".lock-{stripe:02d}"), "w") as fh:
+                    fcntl.flock(fh, fcntl.LOCK_EX)
+                    try:
+                        yield
+                    finally:
+                        fcntl.flock(fh, fcntl.LOCK_UN)
+        finally:
+            with self._locks_guard:
+                if self._locks.get(name) is lock and not lock.locked():
+                    del self._locks[name]
+
+    def get(self, upload_dir: str, filename: str, width: Optional[int], fmt: Optional[str]) -> tuple[str, str]:
+        """Return (variant path, mimetype), generating the variant if needed."""
+        source = safe_join(upload_dir, filename)
+        if source is None or not os.path.isfile(source):
+            raise FileNotFoundError(filename)
+        if fmt is not None and fmt.lower() not in FORMATS:
+            raise VariantError(f"fmt must be one of {', '.join(sorted(FORMATS))}")
+        width = self.snap_width(width)
+        stem, ext = os.path.splitext(os.path.basename(filename))
+        fmt = (fmt or ext.lstrip(".") or "jpeg").lower()
+        if fmt not in FORMATS:
+            fmt = "jpeg"
+        pil_format, out_ext, mimetype = FORMATS[fmt]
+
+        stat = os.stat(source)
+        # Tie the variant to this exact source so replaced files never serve stale variants
+        tag = hashlib.sha1(f"{filename}:{stat.st_mtime_ns}:{stat.st_size}".encode()).hexdigest()[:10]
+        name = f"{stem[:64]}.{tag}.w{width or 0}.{out_ext}"
+        path = os.path.join(self.cache_dir, name)
+
+        if self._touch(path):
+            return path, mimetype
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._variant_lock(name):
+            if not os.path.exists(path):
+                self._render(source, path, width, pil_format)
+                self._evict(keep=path)
+        return path, mimetype
+
+    def _touch(self, path: str) -> bool:
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return False
+        now = time.time()
+        if now - mtime > _TOUCH_INTERVAL:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return True
+
+    def _render(self, source: str, dest: str, width: Optional[int], pil_format: str) -> None:
+        from PIL import Image, UnidentifiedImageError  # type: ignore
+
+        try:
+            opened = Image.open(source)
+        except (UnidentifiedImageError, Image.DecompressionBombError):
+            raise NotAnImage(os.path.basename(source)) from None
+        with opened as img:
+            if width and img.width > width:
+                height = max(1, round(img.height * width / img.width))
+                img.draft("RGB", (width, height))
+                img = img.resize((width, height), Image.Resampling.LANCZOS)
+            if pil_format == "JPEG" and img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".render-")
+            try:
+                with os.fdopen(fd, "wb") as out:
+                    img.save(out, format=pil_format, quality=self.quality)
+                os.replace(tmp_path, dest)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+
+    def _evict(self, keep: str) -> None:
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            entries = [
+                (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                for entry in os.scandir(self.cache_dir)
+                if entry.is_file() and not entry.name.startswith(".")
+            ]
+            total = sum(size for _, size, _ in entries)
+            if total <= self.max_bytes:
+                return
+            # Trim to 90% so we do not evict on every new variant
+            target = self.max_bytes * 0.9
+            for _, size, path in sorted(entries):
+                if path == keep:
+                    continue
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                if total <= target:
+                    break
+        finally:
+            self._evict_lock.release()
+
+
+variant_cache = VariantCache()
+
+
+def init_app(app: Flask) -> None:
+    cache_dir = app.config.get("VARIANT_CACHE_DIR") or os.path.join(app.config["UPLOAD_FOLDER"], ".variants")
+    variant_cache.configure(
+        cache_dir,
+        max_bytes=int(app.config.get("VARIANT_CACHE_MAX_BYTES", 512 * 1024 * 1024)),
+        widths=app.config.get("VARIANT_WIDTHS") or DEFAULT_WIDTHS,
+    )
@@ -0,0 +1,279 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Optional
+
+import requests
+from flask import Flask
+from requests.adapters import HTTPAdapter
+
+DEFAULT_BASE_URL = "https://api.openweathermap.org/data/2.5"
+
+
+class WeatherUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Stops calling upstream after `threshold` consecutive failures, for `reset_after` seconds.
+
+    After the cool-down one trial call is let through (half-open); its
+    outcome closes the circuit again or restarts the cool-down.
+    """
+
+    def __init__(self, threshold: int = 5, reset_after: float = 30.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._failures >= self.threshold or self._opened_at is not None:
+                self._opened_at = time.monotonic()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[dict] = None
+        self.error: Optional[Exception] = None
+
+
+class WeatherClient:
+    """OpenWeather "current weather" lookups with a per-location cache.
+
+    - one pooled requests.Session per worker (keep-alive to upstream)
+    - LRU-bounded cache; entries are fresh for `ttl` seconds and may be
+      served stale for up to `stale_ttl` while a background refresh runs
+    - concurrent misses for the same location share a single upstream call
+    - a circuit breaker fails fast while upstream is down, serving stale data if any
+    """
+
+    def __init__(self):
+        self.base_url = DEFAULT_BASE_URL
+        self.api_key = ""
+        self.timeout: tuple[float, float] = (2.0, 4.0)
+        self.ttl = 600.0
+        self.stale_ttl = 3600.0
+        self.max_entries = 1024
+        self.breaker = CircuitBreaker()
+        self._cache: "OrderedDict[tuple, tuple[float, dict]]" = OrderedDict()
+        self._inflight: dict[tuple, _Flight] = {}
+        self._lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self._session_pid: Optional[int] = None
+        self._pool_size = 10
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self.batch_workers = 8
+        self.upstream_calls = 0
+
+    def configure(self, api_key: str, base_url: str = DEFAULT_BASE_URL, ttl: float = 600.0,
+                  stale_ttl: float = 3600.0, max_entries: int = 1024, timeout: float = 4.0,
+                  pool_size: int = 10, breaker_threshold: int = 5, breaker_reset: float = 30.0,
+                  batch_workers: int = 8) -> None:
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.max_entries = max_entries
+        self.timeout = (min(2.0, timeout), timeout)
+        self._pool_size = pool_size
+        # More lookup threads than pooled connections would only queue on the pool
+        self.batch_workers = max(1, min(batch_workers, pool_size))
+        self._executor = None
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        with self._lock:
+            self._cache.clear()
+        self._session = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def _get_session(self) -> requests.Session:
+        # Sessions hold sockets, which must not be shared across a fork
+        if self._session is None or self._session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self._pool_size, pool_maxsize=self._pool_size, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+            self._session_pid = os.getpid()
+        return self._session
+
+    @staticmethod
+    def location_key(city: Optional[str] = None, lat: Optional[float] = None, lon: Optional[float] = None) -> tuple:
+        if city:
+            return ("q", " ".join(city.lower().split()))
+        if lat is None or lon is None:
+            raise ValueError("city or lat/lon required")
+        # ~1 km grid, so nearby coordinates share a cache entry
+        return ("coord", round(float(lat), 2), round(float(lon), 2))
+
+    def _params(self, key: tuple) -> dict:
+        params = {"appid": self.api_key, "units": "metric"}
+        if key[0] == "q":
+            params["q"] = key[1]
+        else:
+            params["lat"], params["lon"] = key[1], key[2]
+        return params
+
+    def _fetch(self, key: tuple) -> dict:
+        if not self.breaker.allow():
+            raise WeatherUnavailable("upstream circuit open")
+        self.upstream_calls += 1
+        try:
+            resp = self._get_session().get(f"{self.base_url}/weather", params=self._params(key), timeout=self.timeout)
+        except requests.RequestException as e:
+            self.breaker.record_failure()
+            raise WeatherUnavailable(str(e)) from e
+        if resp.status_code >= 500 or resp.status_code == 429:
+            self.breaker.record_failure()
+            raise WeatherUnavailable(f"upstream returned {resp.status_code}")
+        # 4xx (unknown city, bad key) is a valid answer from a healthy upstream
+        self.breaker.record_success()
+        if not resp.ok:
+            raise WeatherUnavailable(f"upstream returned {resp.status_code}")
+        data = resp.json()
+        with self._lock:
+            self._cache[key] = (time.monotonic(), data)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return data
+
+    def _run_flight(self, key: tuple, flight: _Flight) -> None:
+        try:
+            flight.result = self._fetch(key)
+        except Exception as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def _join_flight(self, key: tuple) -> tuple[_Flight, bool]:
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None:
+                return flight, False
+            flight = _Flight()
+            self._inflight[key] = flight
+            return flight, True
+
+    def current(self, city: Optional[str] = None, lat: Optional[float] = None, lon: Optional[float] = None) -> dict:
+        return self._current(self.location_key(city, lat, lon))
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Like the session, worker threads do not survive a fork
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.batch_workers, thread_name_prefix="weather")
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def current_many(self, keys: list, deadline: float) -> dict:
+        """Look up many `location_key`s at once; returns {key: weather dict or WeatherUnavailable}.
+
+        Keys are deduplicated and fetched on a bounded per-worker pool. Lookups
+        still running after `deadline` seconds are reported as unavailable;
+        they keep going in the background and warm the cache for the next call.
+        """
+        unique = list(dict.fromkeys(keys))
+        executor = self._get_executor()
+        futures = {executor.submit(self._current, key): key for key in unique}
+        done, _ = wait(futures, timeout=deadline)
+        results: dict = {}
+        for future, key in futures.items():
+            if future not in done:
+                results[key] = WeatherUnavailable("deadline exceeded")
+                continue
+            error = future.exception()
+            if error is None:
+                results[key] = future.result()
+            else:
+                results[key] = error if isinstance(error, WeatherUnavailable) else WeatherUnavailable(str(error))
+        return results
+
+    def _current(self, key: tuple) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry:
+                self._cache.move_to_end(key)
+        if entry:
+            age = now - entry[0]
+            if age < self.ttl:
+                return entry[1]
+            if age < self.stale_ttl:
+                flight, leader = self._join_flight(key)
+                if leader:
+                    threading.Thread(target=self._run_flight, args=(key, flight), daemon=True).start()
+                return entry[1]
+
+        flight, leader = self._join_flight(key)
+        if leader:
+            self._run_flight(key, flight)
+        elif not flight.done.wait(self.timeout[0] + self.timeout[1]):
+            raise WeatherUnavailable("timed out waiting for upstream")
+        if flight.error is not None:
+            if entry:
+                return entry[1]
+            if isinstance(flight.error, WeatherUnavailable):
+                raise flight.error
+            raise WeatherUnavailable(str(flight.error))
+        return flight.result
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._cache),
+            "inflight": len(self._inflight),
+            "upstreamCalls": self.upstream_calls,
+            "circuit": self.breaker.state,
+        }
+
+
+weather_client = WeatherClient()
+
+
+def init_app(app: Flask) -> None:
+    weather_client.configure(
+        api_key=os.getenv("OPENWEATHER_API_KEY") or app.config.get("OPENWEATHER_API_KEY", ""),
+        base_url=app.config.get("OPENWEATHER_BASE_URL") or DEFAULT_BASE_URL,
+        ttl=float(app.config.get("WEATHER_CACHE_TTL", 600)),
+        stale_ttl=float(app.config.get("WEATHER_STALE_TTL", 3600)),
+        max_entries=int(app.config.get("WEATHER_CACHE_SIZE", 1024)),
+        timeout=float(app.config.get("WEATHER_TIMEOUT", 4)),
+        batch_workers=int(app.config.get("WEATHER_BATCH_WORKERS", 8)),
+    )
@@ -0,0 +1,141 @@
+"""Compare batch disease analysis with one request per image: images/sec end to end.
+
+    python bench/disease_batch.py --images 16 --batch-size 4 --call-ms 400 --image-ms 100
+
+A stub pipeline stands in for Qwen-Image-Edit: every call costs --call-ms
+(model dispatch, text encoding, scheduler setup) plus --image-ms per image
+in the batch, which is how a batched denoising loop behaves. Each path
+uploads the same synthetic photos and waits for every edit job to finish.
+The vectorized leaf check is also timed on its own against detect_leaf.
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from PIL import Image, ImageDraw  # type: ignore
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+class StubPipeline:
+    device = "cpu"
+
+    def __init__(self, call_ms: float, image_ms: float):
+        self.call_s = call_ms / 1000
+        self.image_s = image_ms / 1000
+        self.calls = 0
+
+    def __call__(self, image, prompt=None, **kwargs):
+        images = image if isinstance(image, list) else [image]
+        self.calls += 1
+        time.sleep(self.call_s + self.image_s * len(images))
+        return SimpleNamespace(images=[img.copy() for img in images])
+
+
+def photo(i: int, size: int) -> bytes:
+    # Distinct content per image, so content-addressed uploads do not collapse them
+    img = Image.new("RGB", (size * 4 // 3, size), (120 + i % 40, 90, 60))
+    if i % 5:
+        ImageDraw.Draw(img).ellipse((size // 4, size // 5, size, size * 4 // 5), fill=(50, 150 + i % 60, 40))
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+def wait_for(job_queue, job_ids: set, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    pending = set(job_ids)
+    while pending:
+        if time.monotonic() > deadline:
+            raise SystemExit(f"timed out waiting for {len(pending)} job(s)")
+        for job_id in list(pending):
+            job = job_queue.get(job_id)
+            if job["status"] in ("done", "failed", "cancelled"):
+                if job["status"] != "done":
+                    raise SystemExit(f"job {job_id} {job['status']}: {job.get('error')}")
+                pending.discard(job_id)
+        time.sleep(0.01)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--size", type=int, default=1200, help="Photo height in pixels.")
+    parser.add_argument("--call-ms", type=float, default=400)
+    parser.add_argument("--image-ms", type=float, default=100)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["UPLOAD_FOLDER"] = os.path.join(workdir, "uploads")
+    os.environ["JOB_DB_PATH"] = os.path.join(workdir, "jobs.db")
+    os.environ["JOB_MAX_QUEUE"] = str(args.images + 1)
+    os.environ["QWEN_BATCH_SIZE"] = str(args.batch_size)
+    os.environ["DISEASE_BATCH_MAX"] = str(args.images)
+    os.environ["QWEN_PIPELINE"] = "fake"
+    os.environ["RESPONSE_CACHE_BACKEND"] = "off"
+
+    from app import create_app
+    from app.jobs import job_queue
+    from app.leaf import detect_leaf, detect_leaves
+    from app.pipelines import qwen_registry
+
+    app = create_app()
+    client = app.test_client()
+    stub = StubPipeline(args.call_ms, args.image_ms)
+    qwen_registry.override(stub)
+    photos = [photo(i, args.size) for i in range(args.images)]
+
+    started = time.perf_counter()
+    singles = [detect_leaf(io.BytesIO(data)) for data in photos]
+    leaf_single = time.perf_counter() - started
+    started = time.perf_counter()
+    batched = detect_leaves([io.BytesIO(data) for data in photos])
+    leaf_batch = time.perf_counter() - started
+    assert [d.detected for d in singles] == [d.detected for d in batched]
+
+    rows = []
+
+    stub.calls = 0
+    started = time.perf_counter()
+    job_ids = set()
+    leafy = 0
+    for i, data in enumerate(photos):
+        resp = client.post("/api/ai/disease-detect", data={"image": (io.BytesIO(data), f"p{i}.jpg")},
+                           content_type="multipart/form-data")
+        body = resp.get_json()
+        if body.get("editJob"):
+            job_ids.add(body["editJob"]["id"])
+            leafy += 1
+    wait_for(job_queue, job_ids, timeout=600)
+    rows.append(("single", time.perf_counter() - started, stub.calls, leafy))
+
+    stub.calls = 0
+    started = time.perf_counter()
+    files = [(io.BytesIO(data), f"p{i}.jpg") for i, data in enumerate(photos)]
+    resp = client.post("/api/ai/disease-detect/batch", data={"images": files}, content_type="multipart/form-data")
+    body = resp.get_json()
+    if resp.status_code != 200:
+        raise SystemExit(f"batch request failed: {resp.status_code} {body}")
+    job_ids = {r["editJob"]["id"] for r in body["results"] if r.get("editJob")}
+    wait_for(job_queue, job_ids, timeout=600)
+    rows.append(("batch", time.perf_counter() - started, stub.calls, body["leafDetected"]))
+
+    print(f"{args.images} images ({args.size}px tall), batch size {args.batch_size}, "
+          f"stub cost {args.call_ms:g}ms/call + {args.image_ms:g}ms/image")
+    print(f"leaf check: detect_leaf x{args.images} {leaf_single * 1000:.1f}ms, "
+          f"detect_leaves {leaf_batch * 1000:.1f}ms")
+    print(f"{'path':<8} {'seconds':>8} {'images/s':>9} {'pipe calls':>11} {'edited':>7}")
+    for name, seconds, calls, edited in rows:
+        print(f"{name:<8} {seconds:>8.2f} {args.images / seconds:>9.2f} {calls:>11} {edited:>7}")
+    print(f"speedup: {rows[0][1] / rows[1][1]:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,379 @@
+"""Endpoint latency/throughput benchmark with a committed regression baseline.
+
+    python bench/endpoints.py                       # run and compare with bench/baselines/endpoints.json
+    python bench/endpoints.py --update-baseline     # re-record the baseline
+    python bench/endpoints.py --modes client --requests 500
+
+Generates a synthetic dataset with reset_db.py, then drives customer.market,
+customer.create_order, admin.stats and auth.login. Two modes are supported:
+"client" uses the Flask test client in-process, one request at a time, and
+also records SQL statements per request; "gunicorn" starts a real
+multi-worker gunicorn on wsgi:app and hits it at fixed concurrency.
+Each endpoint is measured --rounds times and the best round is kept.
+Request bodies come from seeded generators, and SQL per request is counted
+on a separate fixed probe set, so it does not depend on --requests, --rounds
+or which round was fastest. The response cache is switched off so the
+market scenarios measure the query path rather than cache hits.
+Results (p50/p95/p99 ms, requests/s, SQL per request, status counts) are
+written as JSON. The run fails if any endpoint's p95 or throughput regresses
+past the tolerance, or it issues more SQL statements than the baseline.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, "bench", "baselines", "endpoints.json")
+ADMIN_EMAIL = "bench-admin@example.test"
+PASSWORD = "password"
+# Latency differences below this are treated as noise, whatever the ratio
+NOISE_FLOOR_MS = 2.0
+# Requests per endpoint in the SQL-count probe; fixed so the count is comparable across settings
+SQL_PROBE_REQUESTS = 30
+
+# A fixed, long-enough key so client and gunicorn tokens agree and PyJWT stays quiet
+os.environ.setdefault("JWT_SECRET_KEY", "bench-endpoints-jwt-secret-0123456789abcdef")
+# Cached catalogue responses would turn every market request after the first into a 0-SQL hit
+os.environ["RESPONSE_CACHE_BACKEND"] = "off"
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(latencies_ms: list[float], wall_s: float, statuses: Counter) -> dict:
+    return {
+        "requests": len(latencies_ms),
+        "p50_ms": round(percentile(latencies_ms, 50), 2),
+        "p95_ms": round(percentile(latencies_ms, 95), 2),
+        "p99_ms": round(percentile(latencies_ms, 99), 2),
+        "mean_ms": round(statistics.fmean(latencies_ms), 2) if latencies_ms else 0.0,
+        "rps": round(len(latencies_ms) / wall_s, 1) if wall_s else 0.0,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+
+def best_round(rounds: list[dict]) -> dict:
+    # Best-of-N damps scheduler noise on shared machines; status counts cover every round
+    best = dict(min(rounds, key=lambda r: r["p95_ms"]))
+    best["rps"] = max(r["rps"] for r in rounds)
+    statuses: Counter = Counter()
+    for r in rounds:
+        statuses.update(r["statuses"])
+    best["statuses"] = dict(sorted(statuses.items()))
+    return best
+
+
+def build_dataset(db_url: str, args: argparse.Namespace) -> dict:
+    import reset_db
+    reset_db.main([
+        "--database-url", db_url,
+        "--farmers", str(args.farmers),
+        "--customers", str(args.customers),
+        "--listings", str(args.listings),
+        "--orders", str(args.orders),
+        "--seed", "7",
+    ])
+
+    from app import create_app
+    from app.config import Config
+    from app.extensions import db
+    from app.models import Inventory, User, UserRole
+    from app.rollups import record_user
+
+    config = type("BenchConfig", (Config,), {"SQLALCHEMY_DATABASE_URI": db_url})
+    app = create_app(config)
+    with app.app_context():
+        admin = User(name="Bench Admin", email=ADMIN_EMAIL, role=UserRole.ADMIN)
+        admin.set_password(PASSWORD)
+        db.session.add(admin)
+        record_user(UserRole.ADMIN)
+        db.session.commit()
+        customer = User.query.filter_by(role=UserRole.CUSTOMER).order_by(User.id).first()
+        listing_ids = [
+            row.id for row in
+            Inventory.query.filter(Inventory.available.is_(True), Inventory.quantity >= 50)
+            .order_by(Inventory.id).limit(2000).all()
+        ]
+    return {"customer_email": customer.email, "listing_ids": listing_ids}
+
+
+class Scenario:
+    """One endpoint: builds (method, path, json body, headers) for each request."""
+
+    def __init__(self, name: str, method: str, path: str, body=None, auth: str = None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.auth = auth
+
+    def request(self, tokens: dict, rng: random.Random) -> tuple[str, str, dict, dict]:
+        body = self.body(rng) if callable(self.body) else self.body
+        headers = {"Authorization": f"Bearer {tokens[self.auth]}"} if self.auth else {}
+        return self.method, self.path, body, headers
+
+    def requests(self, tokens: dict, count: int, seed: str) -> list[tuple[str, str, dict, dict]]:
+        """`count` requests from an RNG seeded by scenario name, identical on every run."""
+        rng = random.Random(f"{seed}:{self.name}")
+        return [self.request(tokens, rng) for _ in range(count)]
+
+
+def scenarios(dataset: dict) -> list[Scenario]:
+    listing_ids = dataset["listing_ids"]
+
+    def order_body(rng: random.Random) -> dict:
+        return {"items": [{"inventoryId": rng.choice(listing_ids), "quantity": 1} for _ in range(rng.randint(1, 3))]}
+
+    return [
+        Scenario("customer.market", "GET", "/api/customer/market"),
+        Scenario("customer.market_price_asc", "GET", "/api/customer/market?sort=price_asc&limit=50"),
+        Scenario("customer.create_order", "POST", "/api/customer/orders", order_body, auth="customer"),
+        Scenario("admin.stats", "GET", "/api/admin/stats", auth="admin"),
+        Scenario("auth.login", "POST", "/api/auth/login", {"email": dataset["customer_email"], "password": PASSWORD}),
+    ]
+
+
+def _login(post, email: str) -> str:
+    status, body = post("/api/auth/login", {"email": email, "password": PASSWORD})
+    if status != 200:
+        raise SystemExit(f"login for {email} failed with {status}")
+    return body["token"]
+
+
+def run_client(db_url: str, dataset: dict, args: argparse.Namespace) -> dict:
+    from sqlalchemy import event
+    from app import create_app
+    from app.config import Config
+    from app.extensions import db
+
+    config = type("BenchConfig", (Config,), {"SQLALCHEMY_DATABASE_URI": db_url})
+    app = create_app(config)
+    client = app.test_client()
+    statements = [0]
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", lambda *a, **k: statements.__setitem__(0, statements[0] + 1))
+
+    def post(path, body):
+        resp = client.post(path, json=body)
+        return resp.status_code, resp.get_json()
+
+    tokens = {"customer": _login(post, dataset["customer_email"]), "admin": _login(post, ADMIN_EMAIL)}
+    results = {}
+    for scenario in scenarios(dataset):
+        count = args.login_requests if scenario.name == "auth.login" else args.requests
+        for method, path, body, headers in scenario.requests(tokens, args.warmup, "warmup"):
+            client.open(path, method=method, json=body, headers=headers)
+
+        statements[0] = 0
+        for method, path, body, headers in scenario.requests(tokens, SQL_PROBE_REQUESTS, "sql-probe"):
+            client.open(path, method=method, json=body, headers=headers).get_data()
+        sql_per_request = round(statements[0] / SQL_PROBE_REQUESTS, 2)
+
+        timed = scenario.requests(tokens, count, "timed")
+        rounds = []
+        for _ in range(args.rounds):
+            latencies, statuses = [], Counter()
+            started = time.perf_counter()
+            for method, path, body, headers in timed:
+                t0 = time.perf_counter()
+                resp = client.open(path, method=method, json=body, headers=headers)
+                resp.get_data()
+                latencies.append((time.perf_counter() - t0) * 1000)
+                statuses[resp.status_code] += 1
+            rounds.append(summarize(latencies, time.perf_counter() - started, statuses))
+        results[scenario.name] = {**best_round(rounds), "sql_per_request": sql_per_request}
+        print(f"client   {scenario.name:28s} {_line(results[scenario.name])}")
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_gunicorn(db_url: str, dataset: dict, args: argparse.Namespace) -> dict:
+    import requests
+
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=db_url, DB_AUTO_CREATE="", PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(args.workers), "-b", f"127.0.0.1:{port}",
+         "--log-level", "warning", "wsgi:app"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                requests.get(f"{base}/api/health", timeout=5)
+                break
+            except requests.RequestException:
+                if proc.poll() is not None or time.monotonic() > deadline:
+                    raise SystemExit("gunicorn did not start")
+                time.sleep(0.2)
+
+        local = threading.local()
+
+        def session():
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+            return local.session
+
+        def post(path, body):
+            resp = session().post(base + path, json=body, timeout=30)
+            return resp.status_code, resp.json()
+
+        tokens = {"customer": _login(post, dataset["customer_email"]), "admin": _login(post, ADMIN_EMAIL)}
+        results = {}
+        for scenario in scenarios(dataset):
+            count = args.login_requests if scenario.name == "auth.login" else args.requests
+            warmup = scenario.requests(tokens, min(args.warmup, count), "warmup")
+            timed = scenario.requests(tokens, count, "timed")
+
+            def one(req):
+                method, path, body, headers = req
+                t0 = time.perf_counter()
+                try:
+                    resp = session().request(method, base + path, json=body, headers=headers, timeout=30)
+                    status = resp.status_code
+                except requests.RequestException:
+                    status = 599
+                return (time.perf_counter() - t0) * 1000, status
+
+            rounds = []
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                list(pool.map(one, warmup))
+                for _ in range(args.rounds):
+                    started = time.perf_counter()
+                    samples = list(pool.map(one, timed))
+                    wall = time.perf_counter() - started
+                    statuses = Counter(status for _, status in samples)
+                    rounds.append(summarize([ms for ms, _ in samples], wall, statuses))
+            results[scenario.name] = best_round(rounds)
+            print(f"gunicorn {scenario.name:28s} {_line(results[scenario.name])}")
+        return results
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def _line(result: dict) -> str:
+    sql = f"  sql/req {result['sql_per_request']:5.1f}" if "sql_per_request" in result else ""
+    return (f"p50 {result['p50_ms']:7.2f}  p95 {result['p95_ms']:7.2f}  p99 {result['p99_ms']:7.2f} ms  "
+            f"{result['rps']:8.1f} req/s{sql}  {result['statuses']}")
+
+
+def compare(results: dict, baseline: dict, latency_tol: float, throughput_tol: float) -> list[str]:
+    failures = []
+    for mode, endpoints in results.items():
+        for name, current in endpoints.items():
+            base = baseline.get(mode, {}).get(name)
+            if not base:
+                continue
+            p95_limit = base["p95_ms"] * (1 + latency_tol)
+            if current["p95_ms"] > p95_limit and current["p95_ms"] - base["p95_ms"] > NOISE_FLOOR_MS:
+                failures.append(f"{mode} {name}: p95 {current['p95_ms']:.2f} ms > {p95_limit:.2f} ms "
+                                f"(baseline {base['p95_ms']:.2f})")
+            rps_floor = base["rps"] * (1 - throughput_tol)
+            # Same noise floor, applied to the wall time per request that req/s implies
+            slower_ms = 1000 / max(current["rps"], 1e-9) - 1000 / max(base["rps"], 1e-9)
+            if current["rps"] < rps_floor and slower_ms > NOISE_FLOOR_MS:
+                failures.append(f"{mode} {name}: {current['rps']:.1f} req/s < {rps_floor:.1f} "
+                                f"(baseline {base['rps']:.1f})")
+            if "sql_per_request" in base and current.get("sql_per_request", 0) > base["sql_per_request"] + 0.01:
+                failures.append(f"{mode} {name}: {current['sql_per_request']} SQL/request > "
+                                f"baseline {base['sql_per_request']}")
+            server_errors = sum(v for k, v in current["statuses"].items() if int(k) >= 500)
+            base_errors = sum(v for k, v in base["statuses"].items() if int(k) >= 500)
+            if server_errors > base_errors:
+                failures.append(f"{mode} {name}: {server_errors} server errors (baseline {base_errors})")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", default="client,gunicorn", help="comma separated: client, gunicorn")
+    parser.add_argument("--requests", type=int, default=300, help="requests per endpoint")
+    parser.add_argument("--login-requests", type=int, default=40, help="auth.login is hashing-bound, run fewer")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3, help="repeat each endpoint, keep the best round")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients in gunicorn mode")
+    parser.add_argument("--farmers", type=int, default=200)
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--listings", type=int, default=20000)
+    parser.add_argument("--orders", type=int, default=50000)
+    parser.add_argument("--database-url", help="generate the dataset here instead of a temp SQLite file (it is reset)")
+    parser.add_argument("--out", default=os.path.join(tempfile.gettempdir(), "farmigo-endpoints.json"))
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--latency-tolerance", type=float, default=0.50, help="allowed p95 growth (0.50 = +50%%)")
+    parser.add_argument("--throughput-tolerance", type=float, default=0.30, help="allowed req/s drop")
+    args = parser.parse_args()
+
+    db_url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/endpoints.db"
+    started = time.perf_counter()
+    dataset = build_dataset(db_url, args)
+    print(f"dataset ready in {time.perf_counter() - started:.1f}s")
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    results = {}
+    if "client" in modes:
+        results["client"] = run_client(db_url, dataset, args)
+    if "gunicorn" in modes:
+        results["gunicorn"] = run_gunicorn(db_url, dataset, args)
+
+    report = {
+        "settings": {k: getattr(args, k) for k in ("requests", "login_requests", "rounds", "workers", "concurrency",
+                                                 "farmers", "customers", "listings", "orders")},
+        "results": results,
+    }
+    with open(args.out, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"results written to {args.out}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as fh:
+            json.dump(report, fh, indent=2)
+            fh.write("\n")
+        print(f"baseline updated: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    failures = compare(results, baseline["results"], args.latency_tolerance, args.throughput_tolerance)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
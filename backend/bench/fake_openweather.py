@@ -0,0 +1,90 @@
+"""A local stand-in for the OpenWeather current-weather API.
+
+    python bench/fake_openweather.py --port 8089 --latency 0.2
+
+Then point the backend at it with
+OPENWEATHER_BASE_URL=http://127.0.0.1:8089/data/2.5 and any OPENWEATHER_API_KEY.
+Temperatures are derived from the city name, so answers are stable.
+"""
+import argparse
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeOpenWeather:
+    """Threaded fake server; tweak `latency` / `fail` while it runs and read `hits`."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.latency = latency
+        self.fail = False
+        self.hits = 0
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                with fake._lock:
+                    fake.hits += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if fake.fail:
+                    return self._send(503, {"cod": 503, "message": "service unavailable"})
+                if url.path.rstrip("/") != "/data/2.5/weather" or not query.get("appid"):
+                    return self._send(401 if not query.get("appid") else 404, {"cod": 404, "message": "not found"})
+                name = query.get("q") or f"{query.get('lat')},{query.get('lon')}"
+                if name.lower().startswith("nowhere"):
+                    return self._send(404, {"cod": "404", "message": "city not found"})
+                seed = zlib.crc32(name.lower().encode())
+                self._send(200, {
+                    "name": name,
+                    "main": {"temp": round(5 + seed % 3000 / 100, 1), "humidity": 30 + seed % 60},
+                })
+
+            def _send(self, status: int, body: dict):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/data/2.5"
+
+    def start(self) -> "FakeOpenWeather":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    fake = FakeOpenWeather(args.host, args.port, args.latency)
+    print(f"Fake OpenWeather on {fake.base_url}")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,125 @@
+"""Seconds per image and peak RSS for each image-edit inference profile.
+
+    python bench/inference_profiles.py --images 3 --size 1024
+    python bench/inference_profiles.py --pipeline real --profiles fast,preview
+
+Every profile runs in its own process, so peak RSS is not inherited from a
+previous, larger profile. --pipeline real loads QwenImageEditPipeline
+(needs torch and diffusers); "stub" is a NumPy stand-in whose cost follows
+the same drivers: attention over conditioning plus generated tokens, once
+per step, twice with true CFG. "auto" uses the real pipeline when it can.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+class StubDiffusionPipeline:
+    device = "cpu"
+    # Pixels per token side; the real model uses 16, 32 keeps the stub fast
+    patch = 32
+    hidden = 64
+
+    def __call__(self, image, prompt=None, num_inference_steps=25, true_cfg_scale=1.0,
+                 negative_prompt=None, width=None, height=None, **kwargs):
+        import numpy as np
+
+        images = image if isinstance(image, list) else [image]
+        if not (width and height):
+            # Like the real pipeline: ~1MP at the input's aspect ratio
+            aspect = images[0].width / images[0].height
+            width, height = int(1024 * aspect ** 0.5) // 32 * 32, int(1024 / aspect ** 0.5) // 32 * 32
+        # The edit pipeline always encodes the conditioning image at ~1MP
+        tokens = (1024 // self.patch) ** 2 + (width // self.patch) * (height // self.patch)
+        passes = 2 if negative_prompt is not None and true_cfg_scale > 1 else 1
+        rng = np.random.default_rng(0)
+        x = rng.standard_normal((len(images), tokens, self.hidden), dtype=np.float32)
+        for _ in range(num_inference_steps * passes):
+            scores = x @ x.transpose(0, 2, 1)
+            x = (scores @ x) / tokens
+        return SimpleNamespace(images=[img.resize((width, height)) for img in images])
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def worker(args) -> int:
+    from PIL import Image, ImageDraw  # type: ignore
+
+    from app.pipelines import INFERENCE_PROFILES, _load_qwen, run_edit
+
+    if args.pipeline == "real":
+        pipe = _load_qwen()
+    else:
+        pipe = StubDiffusionPipeline()
+    loaded_rss = peak_rss_mb()
+
+    img = Image.new("RGB", (args.size * 4 // 3, args.size), (120, 90, 60))
+    ImageDraw.Draw(img).ellipse((args.size // 4, args.size // 5, args.size, args.size * 4 // 5), fill=(50, 150, 40))
+    # Warm-up call: thread setup, channels-last conversion, torch.compile
+    run_edit(pipe, img, "warmup", num_inference_steps=1, profile=args.worker)
+
+    started = time.perf_counter()
+    for _ in range(args.images):
+        out = run_edit(pipe, img, "Highlight diseased leaf regions", profile=args.worker)
+    seconds = (time.perf_counter() - started) / args.images
+    profile = INFERENCE_PROFILES[args.worker]
+    print(json.dumps({
+        "profile": args.worker,
+        "steps": profile.steps,
+        "cfg": profile.cfg,
+        "output": f"{out.size[0]}x{out.size[1]}",
+        "secPerImage": seconds,
+        "loadedRssMb": loaded_rss,
+        "peakRssMb": peak_rss_mb(),
+    }))
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=3)
+    parser.add_argument("--size", type=int, default=1024, help="Input photo height in pixels.")
+    parser.add_argument("--pipeline", choices=("auto", "real", "stub"), default="auto")
+    parser.add_argument("--profiles", default="", help="Comma-separated names (default: all).")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.pipeline == "auto":
+        real = all(importlib.util.find_spec(mod) is not None for mod in ("torch", "diffusers"))
+        args.pipeline = "real" if real else "stub"
+    if args.worker:
+        return worker(args)
+
+    from app.pipelines import INFERENCE_PROFILES
+
+    names = [n for n in args.profiles.split(",") if n] or list(INFERENCE_PROFILES)
+    print(f"pipeline={args.pipeline} images={args.images} input={args.size * 4 // 3}x{args.size}")
+    print(f"{'profile':<9} {'steps':>5} {'cfg':>4} {'output':>10} {'s/img':>8} {'load RSS':>9} {'peak RSS':>9}")
+    for name in names:
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", name, "--images", str(args.images),
+             "--size", str(args.size), "--pipeline", args.pipeline],
+            capture_output=True, text=True,
+        )
+        if proc.returncode:
+            print(f"{name:<9} failed: {proc.stderr.strip().splitlines()[-1] if proc.stderr else proc.returncode}")
+            continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{name:<9} {r['steps']:>5} {'on' if r['cfg'] else 'off':>4} {r['output']:>10} "
+              f"{r['secPerImage']:>8.2f} {r['loadedRssMb']:>8.0f}M {r['peakRssMb']:>8.0f}M")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""Market page cost by JSON provider and response shape.
+
+    python bench/json_payloads.py --limit 200 --requests 200
+
+Generates a small dataset and measures GET /api/customer/market through the
+test client (response cache off) for each combination of provider
+(stdlib, orjson) and shape: the default nested items, ?fields=id,price,cropName,
+and ?layout=columns. It reports mean ms per request and body bytes.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+SHAPES = {
+    "nested": "",
+    "fields": "&fields=id,price,cropName",
+    "columns": "&layout=columns",
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--listings", type=int, default=5000)
+    args = parser.parse_args()
+
+    db_url = f"sqlite:///{tempfile.mkdtemp()}/payloads.db"
+    subprocess.run([sys.executable, "reset_db.py", "--database-url", db_url, "--farmers", "50",
+                    "--customers", "10", "--listings", str(args.listings)],
+                   cwd=BACKEND_DIR, check=True, capture_output=True)
+    os.environ["RESPONSE_CACHE_BACKEND"] = "off"
+    os.environ["METRICS_ENABLED"] = "0"
+
+    from app import create_app
+    from app.config import Config
+
+    print(f"{'provider':9s} {'shape':8s} {'ms/req':>8s} {'bytes':>8s}")
+    for provider in ("stdlib", "orjson"):
+        app = create_app(type("PayloadConfig", (Config,), {"SQLALCHEMY_DATABASE_URI": db_url, "JSON_PROVIDER": provider}))
+        client = app.test_client()
+        for shape, extra in SHAPES.items():
+            url = f"/api/customer/market?limit={args.limit}{extra}"
+            size = len(client.get(url).get_data())
+            started = time.perf_counter()
+            for _ in range(args.requests):
+                client.get(url).get_data()
+            ms = (time.perf_counter() - started) * 1000 / args.requests
+            print(f"{provider:9s} {shape:8s} {ms:8.2f} {size:8d}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
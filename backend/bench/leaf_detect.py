@@ -0,0 +1,82 @@
+"""Compare the vectorized leaf detector with the old per-pixel Python loop.
+
+    python bench/leaf_detect.py --width 4000 --height 3000 --repeat 3
+
+Generates synthetic phone-sized JPEGs (a leaf-like ellipse, and a striped
+image that fools stride sampling) and reports time and green ratio for both.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+from PIL import Image, ImageDraw  # type: ignore
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.leaf import detect_leaf  # noqa: E402
+
+
+def legacy_ratio(source) -> float:
+    # The pre-detector heuristic from ai.disease_detect. Pillow's ImagingCore
+    # does not support slicing, so the original raised and the except branch
+    # reported a leaf for every upload; list() makes it run as intended.
+    img_rgb = Image.open(source).convert("RGB")
+    pixels = list(img_rgb.getdata())
+    total = len(pixels)
+    greenish = 0
+    for r, g, b in pixels[::50]:
+        if g > r + 15 and g > b + 15 and g > 60:
+            greenish += 1
+    return greenish / max(1, total / 50)
+
+
+def leaf_image(width: int, height: int) -> bytes:
+    img = Image.new("RGB", (width, height), (120, 90, 60))
+    ImageDraw.Draw(img).ellipse((width // 4, height // 4, width * 3 // 4, height * 3 // 4), fill=(50, 150, 40))
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+def striped_image(width: int, height: int) -> bytes:
+    # 10px green stripes every 50px: true coverage 20%, but a stride of 50
+    # lands on the same column in every row when the width is a multiple of 50
+    img = Image.new("RGB", (width, height), (120, 90, 60))
+    draw = ImageDraw.Draw(img)
+    for x in range(0, width, 50):
+        draw.rectangle((x, 0, x + 9, height), fill=(50, 150, 40))
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+
+def timed(fn, data: bytes, repeat: int) -> tuple[float, object]:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(io.BytesIO(data))
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for name, data in (("leaf.jpg", leaf_image(args.width, args.height)), ("stripes.png", striped_image(args.width, args.height))):
+        legacy_s, legacy = timed(legacy_ratio, data, args.repeat)
+        new_s, detection = timed(detect_leaf, data, args.repeat)
+        print(f"{name} {args.width}x{args.height}")
+        print(f"  legacy loop : {legacy_s * 1000:8.1f} ms  ratio={legacy:.3f}")
+        print(f"  detect_leaf : {new_s * 1000:8.1f} ms  ratio={detection.ratio:.3f} bbox={detection.bbox}")
+        print(f"  speedup     : {legacy_s / new_s:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
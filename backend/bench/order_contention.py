@@ -0,0 +1,81 @@
+"""Fire many parallel orders at one hot listing and check stock never oversells.
+
+    python bench/order_contention.py --orders 400 --stock 150 --threads 64
+
+Runs against a throwaway SQLite database unless --database-url is given.
+Exits non-zero if the listing's stock goes negative or units sold plus units
+left does not add up to the starting stock.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=400)
+    parser.add_argument("--stock", type=int, default=150)
+    parser.add_argument("--quantity", type=int, default=1, help="units per order")
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/contention.db"
+
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import func
+    from app import create_app
+    from app.extensions import db
+    from app.models import Inventory, OrderItem, User, UserRole
+    from app.schema import ensure_schema
+
+    app = create_app()
+    with app.app_context():
+        ensure_schema(db.engine)
+        farmer = User(name="Hot Farmer", email=f"hot-farmer-{time.time_ns()}@bench.local", role=UserRole.FARMER)
+        customer = User(name="Buyer", email=f"buyer-{time.time_ns()}@bench.local", role=UserRole.CUSTOMER)
+        farmer.set_password("bench")
+        customer.set_password("bench")
+        db.session.add_all([farmer, customer])
+        db.session.flush()
+        listing = Inventory(farmer_id=farmer.id, crop_name="Hot Tomato", price=2.5, quantity=args.stock)
+        db.session.add(listing)
+        db.session.commit()
+        listing_id = listing.id
+        token = create_access_token(identity=str(customer.id), additional_claims={"role": UserRole.CUSTOMER.value})
+
+    headers = {"Authorization": f"Bearer {token}"}
+    payload = {"items": [{"inventoryId": listing_id, "quantity": args.quantity}]}
+
+    def place(_):
+        with app.test_client() as client:
+            return client.post("/api/customer/orders", json=payload, headers=headers).status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        statuses = Counter(pool.map(place, range(args.orders)))
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        remaining = db.session.get(Inventory, listing_id).quantity
+        sold = db.session.query(func.coalesce(func.sum(OrderItem.quantity), 0)).filter_by(inventory_id=listing_id).scalar()
+
+    print(f"{args.orders} orders in {elapsed:.2f}s ({args.orders / elapsed:.0f}/s), statuses: {dict(statuses)}")
+    print(f"stock: start={args.stock} sold={sold} remaining={remaining}")
+
+    ok = remaining >= 0 and sold + remaining == args.stock and statuses[201] * args.quantity == sold
+    print("OK" if ok else "OVERSOLD")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
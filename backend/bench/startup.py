@@ -0,0 +1,112 @@
+"""Guard cold-start cost: import time of the WSGI entry and time to first request.
+
+    python bench/startup.py --runs 5 --max-import-ms 1500 --max-cold-ms 2500
+
+Runs `python -X importtime -c "import wsgi"` in a fresh interpreter. It
+reports the total and the slowest modules, and fails if any heavy AI module
+(torch, diffusers, PIL, numpy, google.generativeai) is imported at boot. It
+then times fresh processes from interpreter start to the first
+/api/customer/market response. Budgets are in milliseconds; the median
+over --runs is compared.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+HEAVY_MODULES = ("torch", "diffusers", "PIL", "numpy", "google.generativeai", "transformers")
+
+COLD_REQUEST = """
+import json
+import time
+started = time.perf_counter()
+import wsgi
+imported = time.perf_counter()
+resp = wsgi.app.test_client().get("/api/customer/market")
+assert resp.status_code == 200, resp.status_code
+done = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "first_request_ms": (done - imported) * 1000, "total_ms": (done - started) * 1000}))
+"""
+
+
+def _env(db_path: str) -> dict:
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{db_path}"
+    env["DB_AUTO_CREATE"] = ""
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def import_profile(env: dict) -> tuple[float, list[tuple[float, str]], set[str]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import wsgi"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    modules: list[tuple[float, str]] = []
+    total_us = 0.0
+    names: set[str] = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        names.add(name)
+        modules.append((int(self_us) / 1000, name))
+        if name == "wsgi":
+            total_us = int(cumulative_us)
+    return total_us / 1000, sorted(modules, reverse=True)[:10], names
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=1500)
+    parser.add_argument("--max-cold-ms", type=float, default=2500)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    env = _env(os.path.join(workdir, "startup.db"))
+    subprocess.run([sys.executable, "-m", "flask", "--app", "wsgi", "init-db"], cwd=BACKEND_DIR, env=env,
+                   check=True, capture_output=True)
+
+    import_ms, slowest, names = import_profile(env)
+    heavy = sorted(n for n in names if n.split(".")[0] in HEAVY_MODULES or n in HEAVY_MODULES)
+    print(f"import wsgi: {import_ms:.0f} ms cumulative")
+    for self_ms, name in slowest:
+        print(f"  {self_ms:7.1f} ms  {name}")
+
+    runs = []
+    for _ in range(args.runs):
+        proc = subprocess.run([sys.executable, "-c", COLD_REQUEST], cwd=BACKEND_DIR, env=env,
+                              capture_output=True, text=True, check=True)
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    cold_ms = statistics.median(r["total_ms"] for r in runs)
+    first_ms = statistics.median(r["first_request_ms"] for r in runs)
+    print(f"cold start to first /api/customer/market: {cold_ms:.0f} ms median "
+          f"(first request itself {first_ms:.0f} ms) over {args.runs} runs")
+
+    failures = []
+    if heavy:
+        failures.append(f"heavy modules imported at boot: {', '.join(heavy)}")
+    if import_ms > args.max_import_ms:
+        failures.append(f"import time {import_ms:.0f} ms > budget {args.max_import_ms:.0f} ms")
+    if cold_ms > args.max_cold_ms:
+        failures.append(f"cold start {cold_ms:.0f} ms > budget {args.max_cold_ms:.0f} ms")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"import_ms": import_ms, "cold_ms": cold_ms, "first_request_ms": first_ms, "heavy": heavy}, fh, indent=2)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""Show what HTTP caching saves on /uploads: bytes and time for first vs repeat views.
+
+    python bench/uploads_http.py --views 200
+
+Serves a content-addressed upload, a legacy-named upload and a WebP variant
+through the Flask test client. Each is fetched once cold and then
+revalidated with If-None-Match, as a browser or CDN would. A Range request
+is also checked. Exits non-zero if a revalidation returns a body.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+SAMPLE = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "uploads", "leaf.jpg"))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--views", type=int, default=200)
+    parser.add_argument("--image", default=SAMPLE)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["UPLOAD_FOLDER"] = os.path.join(workdir, "uploads")
+
+    from app import create_app
+    from app.storage import store_stream
+
+    app = create_app()
+    upload_dir = app.config["UPLOAD_FOLDER"]
+    with open(args.image, "rb") as fh:
+        hashed = store_stream(fh, upload_dir, os.path.splitext(args.image)[1])
+    shutil.copy(args.image, os.path.join(upload_dir, "legacy-name.jpg"))
+
+    ok = True
+    client = app.test_client()
+    for label, url in (
+        ("content-addressed", f"/uploads/{hashed}"),
+        ("legacy name", "/uploads/legacy-name.jpg"),
+        ("webp variant", f"/uploads/{hashed}?w=160&fmt=webp"),
+    ):
+        first = client.get(url)
+        etag = first.headers["ETag"]
+        body = len(first.get_data())
+        first.close()
+
+        started = time.perf_counter()
+        repeat_bytes = 0
+        statuses = set()
+        for _ in range(args.views):
+            repeat = client.get(url, headers={"If-None-Match": etag})
+            repeat_bytes += len(repeat.get_data())
+            statuses.add(repeat.status_code)
+            repeat.close()
+        elapsed = time.perf_counter() - started
+
+        ranged = client.get(url, headers={"Range": "bytes=0-99"})
+        range_ok = ranged.status_code == 206 and len(ranged.get_data()) == min(100, body)
+        ranged.close()
+
+        print(f"{label}: {url}")
+        print(f"  first view   : {first.status_code} {body} bytes, Cache-Control: {first.headers.get('Cache-Control')}")
+        print(f"  {args.views} repeats  : statuses {sorted(statuses)}, {repeat_bytes} body bytes, "
+              f"{elapsed / args.views * 1000:.2f} ms/request")
+        print(f"  range 0-99   : {'206 ok' if range_ok else 'FAILED'}")
+        ok = ok and statuses == {304} and repeat_bytes == 0 and range_ok
+
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
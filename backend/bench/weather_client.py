@@ -0,0 +1,102 @@
+"""Exercise the weather client against the fake OpenWeather server.
+
+    python bench/weather_client.py --requests 200 --latency 0.2
+
+Checks, in order: concurrent misses for one city coalesce into one upstream
+call; repeat lookups are served from cache; expired entries are served stale
+while one background refresh runs; and an upstream outage trips the circuit
+breaker, so later calls fail fast. Finally a batch lookup dedupes keys,
+fetches concurrently, and reports anything past its deadline as unavailable.
+Exits non-zero on any failed check.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.weather import WeatherClient, WeatherUnavailable  # noqa: E402
+from fake_openweather import FakeOpenWeather  # noqa: E402
+
+
+def check(label: str, ok: bool, detail: str) -> bool:
+    print(f"[{'ok' if ok else 'FAIL'}] {label}: {detail}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    fake = FakeOpenWeather(latency=args.latency).start()
+    client = WeatherClient()
+    client.configure(api_key="bench", base_url=fake.base_url, ttl=0.5, stale_ttl=60, breaker_threshold=3, breaker_reset=1.0)
+    results = []
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=64) as pool:
+        temps = list(pool.map(lambda _: client.current(city="Chennai")["main"]["temp"], range(args.requests)))
+    cold = time.perf_counter() - started
+    results.append(check("single-flight", fake.hits == 1 and len(set(temps)) == 1,
+                         f"{args.requests} concurrent misses -> {fake.hits} upstream call(s) in {cold * 1000:.0f} ms"))
+
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        client.current(city="  chennai ")
+    warm = (time.perf_counter() - started) / args.requests
+    results.append(check("cache hit", fake.hits == 1, f"{warm * 1e6:.1f} us/lookup, still {fake.hits} upstream call(s)"))
+
+    time.sleep(0.6)
+    started = time.perf_counter()
+    client.current(city="Chennai")
+    stale_latency = time.perf_counter() - started
+    time.sleep(args.latency + 0.2)
+    results.append(check("stale-while-revalidate", stale_latency < args.latency / 2 and fake.hits == 2,
+                         f"stale answer in {stale_latency * 1000:.1f} ms, refreshed in background ({fake.hits} calls)"))
+
+    fake.fail = True
+    failures = 0
+    for i in range(6):
+        try:
+            client.current(city=f"Outage {i}")
+        except WeatherUnavailable:
+            failures += 1
+    hits_during_outage = fake.hits - 2
+    results.append(check("circuit breaker", failures == 6 and hits_during_outage == 3 and client.breaker.state == "open",
+                         f"6 lookups during outage -> {hits_during_outage} upstream calls, circuit {client.breaker.state}"))
+
+    time.sleep(0.6)
+    served = client.current(city="Chennai")
+    results.append(check("stale during outage", served["main"]["temp"] == temps[0], "expired entry still served"))
+
+    fake.fail = False
+    time.sleep(1.1)
+    client.current(city="Recovered")
+    results.append(check("recovery", client.breaker.state == "closed", f"half-open trial succeeded, circuit {client.breaker.state}"))
+
+    cities = [f"Batch {i}" for i in range(8)]
+    keys = [client.location_key(city=c) for c in cities + cities]
+    hits_before = fake.hits
+    started = time.perf_counter()
+    answers = client.current_many(keys, deadline=args.latency * 4)
+    batch = time.perf_counter() - started
+    results.append(check("batch", len(answers) == 8 and fake.hits - hits_before == 8 and batch < args.latency * 3,
+                         f"16 lookups (8 unique) -> {fake.hits - hits_before} upstream calls in {batch * 1000:.0f} ms "
+                         f"(serial would take ~{8 * args.latency * 1000:.0f} ms)"))
+
+    fake.latency = args.latency * 5
+    answers = client.current_many([client.location_key(city="Slow city")], deadline=args.latency)
+    results.append(check("batch deadline", isinstance(answers[("q", "slow city")], WeatherUnavailable),
+                         "lookup past the deadline reported as unavailable"))
+
+    fake.stop()
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
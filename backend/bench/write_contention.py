@@ -0,0 +1,155 @@
+"""Multi-process write contention on SQLite: order and listing throughput per engine profile.
+
+    python bench/write_contention.py --processes 4 --seconds 10 --profiles none,sqlite
+
+For each profile a fresh database is generated. Then --processes worker
+processes (standing in for gunicorn workers), each with --threads threads,
+drive create_order (and one create_inventory in every --listing-every
+writes) through the Flask test client for --seconds. The script reports
+successful writes per second and the error mix: 503 is "database is
+locked" surfaced by the view, 500 is an unhandled lock error. With
+--min-speedup, it exits non-zero unless the last profile beats the first
+by that factor.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# Long enough that PyJWT does not warn on every token
+os.environ.setdefault("JWT_SECRET_KEY", "bench-write-contention-jwt-secret-0123456789")
+sys.path.insert(0, BACKEND_DIR)
+
+
+def _worker(db_url: str, profile: str, seconds: float, threads: int, listing_every: int,
+            customer_ids: list, farmer_ids: list, listing_ids: list, out) -> None:
+    os.environ["DB_ENGINE_PROFILE"] = profile
+    os.environ["RESPONSE_CACHE_BACKEND"] = "off"
+    os.environ["METRICS_ENABLED"] = "0"
+    import logging
+    logging.disable(logging.CRITICAL)
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+    from app.config import Config
+
+    app = create_app(type("ContentionConfig", (Config,), {"SQLALCHEMY_DATABASE_URI": db_url}))
+    with app.app_context():
+        customer_headers = [{"Authorization": "Bearer " + create_access_token(
+            identity=str(cid), additional_claims={"role": "customer"})} for cid in customer_ids]
+        farmer_headers = [{"Authorization": "Bearer " + create_access_token(
+            identity=str(fid), additional_claims={"role": "farmer"})} for fid in farmer_ids]
+
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def loop(seed: int) -> None:
+        rng = random.Random(seed)
+        client = app.test_client()
+        local: Counter = Counter()
+        n = 0
+        while time.monotonic() < deadline:
+            n += 1
+            try:
+                if listing_every and n % listing_every == 0:
+                    resp = client.post("/api/farmer/inventory", headers=rng.choice(farmer_headers),
+                                       json={"cropName": "Contention lot", "price": 10, "quantity": 100})
+                    local[("listing", resp.status_code)] += 1
+                else:
+                    items = [{"inventoryId": rng.choice(listing_ids), "quantity": 1} for _ in range(rng.randint(1, 3))]
+                    resp = client.post("/api/customer/orders", headers=rng.choice(customer_headers), json={"items": items})
+                    local[("order", resp.status_code)] += 1
+            except Exception as e:  # an unhandled lock error escaping the view
+                local[("error", type(e).__name__)] += 1
+        with lock:
+            statuses.update(local)
+
+    workers = [threading.Thread(target=loop, args=(os.getpid() * 100 + i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    out.put({f"{kind}:{code}": count for (kind, code), count in statuses.items()})
+
+
+def run_profile(profile: str, args: argparse.Namespace) -> dict:
+    workdir = tempfile.mkdtemp()
+    db_url = f"sqlite:///{workdir}/contention.db"
+    # Generated without engine tuning, so every profile starts from the default rollback journal
+    subprocess.run(
+        [sys.executable, "reset_db.py", "--database-url", db_url, "--farmers", "20", "--customers", "200",
+         "--listings", "2000", "--orders", "2000"],
+        cwd=BACKEND_DIR, env=dict(os.environ, DB_ENGINE_PROFILE="none"), check=True, capture_output=True,
+    )
+    conn = sqlite3.connect(f"{workdir}/contention.db")
+    conn.execute("UPDATE inventory SET quantity = 1000000, available = 1")
+    conn.commit()
+    listing_ids = [r[0] for r in conn.execute("SELECT id FROM inventory")]
+    farmer_ids = [r[0] for r in conn.execute("SELECT id FROM users WHERE role = 'FARMER'")]
+    customer_ids = [r[0] for r in conn.execute("SELECT id FROM users WHERE role = 'CUSTOMER'")]
+    conn.close()
+
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue()
+    procs = [
+        ctx.Process(target=_worker, args=(db_url, profile, args.seconds, args.threads, args.listing_every,
+                                          customer_ids, farmer_ids, listing_ids, out))
+        for _ in range(args.processes)
+    ]
+    for p in procs:
+        p.start()
+    totals: Counter = Counter()
+    for _ in procs:
+        totals.update(out.get())
+    for p in procs:
+        p.join()
+    ok = totals.get("order:201", 0) + totals.get("listing:201", 0)
+    return {
+        "profile": profile,
+        "writes_per_s": round(ok / args.seconds, 1),
+        "orders_per_s": round(totals.get("order:201", 0) / args.seconds, 1),
+        "statuses": dict(sorted(totals.items())),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", default="none,sqlite", help="DB_ENGINE_PROFILE values to compare, in order")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4, help="threads per process")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--listing-every", type=int, default=10, help="every Nth write creates a listing (0 = never)")
+    parser.add_argument("--min-speedup", type=float, default=None)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for profile in [p.strip() for p in args.profiles.split(",") if p.strip()]:
+        result = run_profile(profile, args)
+        results.append(result)
+        print(f"{profile:8s} {result['writes_per_s']:8.1f} writes/s  {result['orders_per_s']:8.1f} orders/s  "
+              f"{result['statuses']}")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+    if args.min_speedup and len(results) > 1:
+        speedup = results[-1]["writes_per_s"] / max(results[0]["writes_per_s"], 1e-9)
+        print(f"speedup {results[-1]['profile']} vs {results[0]['profile']}: {speedup:.2f}x")
+        if speedup < args.min_speedup:
+            print(f"FAIL: expected at least {args.min_speedup:.2f}x")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,6 +23,10 @@ CREATE TABLE IF NOT EXISTS inventory (
   price DOUBLE NOT NULL,
   quantity INT NOT NULL,
   available TINYINT(1) DEFAULT 1,
+  INDEX ix_inventory_available_id (available, id),
+  INDEX ix_inventory_available_price_id (available, price, id),
+  INDEX ix_inventory_farmer_id (farmer_id),
+  FULLTEXT INDEX ft_inventory_crop_name (crop_name) WITH PARSER ngram,
   CONSTRAINT fk_inventory_farmer FOREIGN KEY (farmer_id) REFERENCES users (id) ON DELETE CASCADE
 );
 
@@ -31,6 +35,7 @@ CREATE TABLE IF NOT EXISTS orders (
   customer_id INT NOT NULL,
   total_amount DOUBLE NOT NULL,
   created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  INDEX ix_orders_customer_created_id (customer_id, created_at, id),
   CONSTRAINT fk_orders_customer FOREIGN KEY (customer_id) REFERENCES users (id) ON DELETE CASCADE
 );
 
@@ -40,6 +45,8 @@ CREATE TABLE IF NOT EXISTS order_items (
   inventory_id INT NOT NULL,
   quantity INT NOT NULL,
   price DOUBLE NOT NULL,
+  INDEX ix_order_items_order_id (order_id),
+  INDEX ix_order_items_inventory_id (inventory_id),
   CONSTRAINT fk_order_items_order FOREIGN KEY (order_id) REFERENCES orders (id) ON DELETE CASCADE,
   CONSTRAINT fk_order_items_inventory FOREIGN KEY (inventory_id) REFERENCES inventory (id) ON DELETE CASCADE
 );
@@ -0,0 +1,32 @@
+import os
+import shutil
+import tempfile
+
+# Prometheus multiprocess mode: every worker writes metrics to files in this
+# directory and /api/metrics aggregates them. It must be set before the app
+# (and prometheus_client) is imported in the workers.
+_metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "farmigo-metrics")
+)
+
+
+def on_starting(server):
+    # Counters from a previous run must not leak into this one
+    shutil.rmtree(_metrics_dir, ignore_errors=True)
+    os.makedirs(_metrics_dir, exist_ok=True)
+
+
+def post_worker_init(worker):
+    # Resume queued jobs and reclaim lapsed leases now, not on the next submission
+    from app.jobs import job_queue
+
+    if job_queue.path:
+        job_queue.start()
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
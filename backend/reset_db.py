@@ -1,6 +1,20 @@
+import argparse
+import math
+import random
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import func, insert
+from werkzeug.security import generate_password_hash
+
 from app import create_app
+from app.config import Config
 from app.extensions import db
-from app.models import Crop
+from app.models import Crop, Inventory, Order, OrderItem, User, UserRole
+from app.response_cache import response_cache
+from app.schema import ensure_schema
 
 
 SEED_CROPS: list[tuple[str, str, str]] = [
@@ -9,21 +23,253 @@ SEED_CROPS: list[tuple[str, str, str]] = [
     ("wheat", "Wheat", "High quality wheat"),
 ]
 
+# (name, typical price per unit) for generated listings
+GENERATED_CROPS: list[tuple[str, float]] = [
+    ("Tomato", 30), ("Potato", 22), ("Wheat", 28), ("Rice", 45), ("Onion", 35), ("Maize", 20),
+    ("Carrot", 40), ("Cabbage", 25), ("Cauliflower", 38), ("Brinjal", 32), ("Okra", 42), ("Chilli", 80),
+    ("Garlic", 120), ("Ginger", 110), ("Banana", 50), ("Mango", 90), ("Papaya", 35), ("Guava", 60),
+    ("Spinach", 30), ("Coriander", 70), ("Millet", 55), ("Sorghum", 38), ("Barley", 33), ("Groundnut", 95),
+    ("Soybean", 60), ("Mustard", 75), ("Turmeric", 140), ("Cucumber", 28), ("Pumpkin", 18), ("Peas", 65),
+]
+VARIETIES = ["", "Organic ", "Hybrid ", "Desi ", "Premium ", "Fresh "]
+
 
 def reset_and_seed_database() -> None:
     app = create_app()
     with app.app_context():
         db.drop_all()
-        db.create_all()
+        ensure_schema(db.engine)
 
         for crop_code, name, description in SEED_CROPS:
             db.session.add(Crop(crop=crop_code, name=name, description=description))
 
         db.session.commit()
+        # Cached market/crop responses describe the old rows
+        response_cache.clear()
         print("Database reset complete. Seeded crops:", ", ".join([name for _, name, _ in SEED_CROPS]))
 
 
-if __name__ == "__main__":
-    reset_and_seed_database()
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    chunk: list[dict] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _skewed_index(rng: random.Random, n: int, alpha: float) -> int:
+    # Zipf-like popularity: low indexes are picked far more often than high ones
+    return min(n - 1, int(n * rng.random() ** alpha))
+
+
+def _recent_datetime(rng: random.Random, now: datetime, days: int) -> datetime:
+    # Squared uniform puts more activity in recent weeks, like a growing marketplace
+    return now - timedelta(seconds=int(days * 86400 * rng.random() ** 2))
+
+
+class DataGenerator:
+    """Streams synthetic users, listings, orders and order items into the database.
+
+    Rows are produced lazily and written with Core executemany in chunks, so
+    memory stays flat regardless of counts; only listing prices (one float per
+    listing) are kept to price order items.
+    """
+
+    def __init__(self, farmers: int, customers: int, listings: int, orders: int, order_items: int,
+                 days: int = 365, chunk_size: int = 20000, seed: int = 42):
+        self.farmers = farmers
+        self.customers = customers
+        self.listings = listings
+        self.orders = orders
+        self.order_items = max(order_items, orders)
+        self.days = days
+        self.chunk_size = chunk_size
+        self.rng = random.Random(seed)
+        self.now = datetime.utcnow()
+
+    def _insert(self, conn, table, rows: Iterable[dict], label: str, total: int) -> None:
+        started = time.perf_counter()
+        written = 0
+        for chunk in _chunks(rows, self.chunk_size):
+            conn.execute(insert(table), chunk)
+            conn.commit()
+            written += len(chunk)
+            if total >= 10 * self.chunk_size and written % (10 * self.chunk_size) < self.chunk_size:
+                print(f"  {label}: {written:,}/{total:,}")
+        elapsed = time.perf_counter() - started
+        print(f"{label}: {written:,} rows in {elapsed:.1f}s ({written / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    def _users(self, first_id: int, count: int, role: UserRole, password_hash: str) -> Iterator[dict]:
+        prefix = role.value
+        for offset in range(count):
+            user_id = first_id + offset
+            yield {
+                "id": user_id,
+                "name": f"{prefix.title()} {user_id}",
+                "email": f"{prefix}{user_id}@example.test",
+                "password_hash": password_hash,
+                "role": role,
+                "created_at": _recent_datetime(self.rng, self.now, self.days),
+            }
+
+    def _listings(self, first_id: int, first_farmer: int, prices: array) -> Iterator[dict]:
+        rng = self.rng
+        for offset in range(self.listings):
+            name, base_price = GENERATED_CROPS[_skewed_index(rng, len(GENERATED_CROPS), 1.6)]
+            # Log-normal spread around the crop's typical price, a few premium outliers
+            price = round(base_price * math.exp(rng.gauss(0, 0.35)), 2)
+            prices.append(price)
+            yield {
+                "id": first_id + offset,
+                "farmer_id": first_farmer + _skewed_index(rng, self.farmers, 2.0),
+                "crop_name": f"{rng.choice(VARIETIES)}{name}",
+                "price": price,
+                "quantity": int(rng.expovariate(1 / 200)) + 1,
+                "available": rng.random() > 0.1,
+                "image_url": None,
+            }
 
+    def _orders_and_items(self, conn, first_order: int, first_item: int, first_customer: int,
+                          first_listing: int, prices: array) -> None:
+        rng = self.rng
+        base, extra = divmod(self.order_items, self.orders)
+        item_id = first_item
+        started = time.perf_counter()
+        written_orders = written_items = 0
+        orders: list[dict] = []
+        items: list[dict] = []
+        for offset in range(self.orders):
+            order_id = first_order + offset
+            total = 0.0
+            for _ in range(base + (1 if offset < extra else 0)):
+                listing = _skewed_index(rng, len(prices), 2.5)
+                qty = min(50, int(rng.expovariate(1 / 3)) + 1)
+                price = prices[listing]
+                total += price * qty
+                items.append({
+                    "id": item_id,
+                    "order_id": order_id,
+                    "inventory_id": first_listing + listing,
+                    "quantity": qty,
+                    "price": price,
+                })
+                item_id += 1
+            orders.append({
+                "id": order_id,
+                "customer_id": first_customer + _skewed_index(rng, self.customers, 1.5),
+                "total_amount": round(total, 2),
+                "created_at": _recent_datetime(rng, self.now, self.days),
+            })
+            if len(items) >= self.chunk_size:
+                conn.execute(insert(Order.__table__), orders)
+                conn.execute(insert(OrderItem.__table__), items)
+                conn.commit()
+                written_orders += len(orders)
+                written_items += len(items)
+                orders, items = [], []
+                if written_items % (10 * self.chunk_size) < self.chunk_size:
+                    print(f"  orders: {written_orders:,}/{self.orders:,}, items: {written_items:,}/{self.order_items:,}")
+        if orders:
+            conn.execute(insert(Order.__table__), orders)
+            conn.execute(insert(OrderItem.__table__), items)
+            conn.commit()
+            written_orders += len(orders)
+            written_items += len(items)
+        elapsed = time.perf_counter() - started
+        print(f"orders: {written_orders:,}, order items: {written_items:,} in {elapsed:.1f}s "
+              f"({written_items / max(elapsed, 1e-9):,.0f} items/s)")
 
+    def run(self) -> None:
+        def next_id(model) -> int:
+            return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+        first_farmer = next_id(User)
+        first_customer = first_farmer + self.farmers
+        first_listing = next_id(Inventory)
+        first_order = next_id(Order)
+        first_item = next_id(OrderItem)
+        db.session.commit()
+        password_hash = generate_password_hash("password")
+        prices = array("d")
+
+        with db.engine.connect() as conn:
+            if conn.dialect.name == "sqlite":
+                # Bulk load only: a crash mid-load means re-running the generator
+                conn.exec_driver_sql("PRAGMA synchronous=OFF")
+            self._insert(conn, User.__table__, self._users(first_farmer, self.farmers, UserRole.FARMER, password_hash),
+                         "farmers", self.farmers)
+            self._insert(conn, User.__table__, self._users(first_customer, self.customers, UserRole.CUSTOMER, password_hash),
+                         "customers", self.customers)
+            self._insert(conn, Inventory.__table__, self._listings(first_listing, first_farmer, prices),
+                         "listings", self.listings)
+            if self.orders:
+                self._orders_and_items(conn, first_order, first_item, first_customer, first_listing, prices)
+
+
+def generate(args: argparse.Namespace) -> None:
+    config_class = Config
+    if args.database_url:
+        config_class = type("GeneratorConfig", (Config,), {"SQLALCHEMY_DATABASE_URI": args.database_url})
+    if args.orders and not (args.customers and args.listings):
+        raise SystemExit("--orders needs --customers and --listings")
+    if args.listings and not args.farmers:
+        raise SystemExit("--listings needs --farmers")
+
+    app = create_app(config_class)
+    with app.app_context():
+        if not args.append:
+            db.drop_all()
+        ensure_schema(db.engine)
+        if not args.append:
+            for crop_code, name, description in SEED_CROPS:
+                db.session.add(Crop(crop=crop_code, name=name, description=description))
+            db.session.commit()
+
+        started = time.perf_counter()
+        DataGenerator(
+            farmers=args.farmers,
+            customers=args.customers,
+            listings=args.listings,
+            orders=args.orders,
+            order_items=args.order_items or args.orders * 3,
+            days=args.days,
+            chunk_size=args.chunk_size,
+            seed=args.seed,
+        ).run()
+
+        from app.rollups import rebuild
+        rollup_started = time.perf_counter()
+        rebuild()
+        db.session.commit()
+        print(f"rollups rebuilt in {time.perf_counter() - rollup_started:.1f}s")
+        response_cache.clear()
+        print(f"done in {time.perf_counter() - started:.1f}s")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Reset the database and seed crops; with counts, also generate a synthetic marketplace.",
+    )
+    parser.add_argument("--farmers", type=int, default=0)
+    parser.add_argument("--customers", type=int, default=0)
+    parser.add_argument("--listings", type=int, default=0)
+    parser.add_argument("--orders", type=int, default=0)
+    parser.add_argument("--order-items", type=int, default=0, help="total order items (default: 3 per order)")
+    parser.add_argument("--days", type=int, default=365, help="spread order and signup dates over this many days")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="rows per executemany batch")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--append", action="store_true", help="add to the existing data instead of resetting")
+    parser.add_argument("--database-url", default=None, help="override DATABASE_URL")
+    args = parser.parse_args(argv)
+
+    if not any((args.farmers, args.customers, args.listings, args.orders, args.append, args.database_url)):
+        reset_and_seed_database()
+        return
+    generate(args)
+
+
+if __name__ == "__main__":
+    main()